@@ -57,15 +57,20 @@ class StaticRouteExtractor
     }
 }
 
-//  Usage example
+//  Usage: php StaticRouteExtractor.php [output.json]
+if (in_array($argv[1] ?? '', ['-h', '--help'], true)) {
+    echo "Usage: php StaticRouteExtractor.php [output.json]\n";
+    exit(0);
+}
 $wpBase = '/var/www/html'; // adjust as needed
+$outputFile = $argv[1] ?? __DIR__ . '/output/static_routes_full.json';
 
 $extractor = new StaticRouteExtractor([
     "$wpBase/wp-content/plugins",
     "$wpBase/wp-content/themes",
     "$wpBase/wp-includes",
     "$wpBase/wp-admin",
-], __DIR__ . '/output/static_routes_full.json');
+], $outputFile);
 
 $extractor->extractRoutes();
 
@@ -1,11 +1,39 @@
-from flask import Flask, render_template, request, jsonify, send_from_directory
-import subprocess
+from flask import Flask, render_template, request, jsonify, send_from_directory, Response
+import json
 import os
 import pathlib
+import sys
+import threading
+
+from jobs import JobQueue
 
 app = Flask(__name__, static_folder="static", template_folder="templates")
 ROOT = pathlib.Path(__file__).resolve().parent.parent
 
+# The Python stages run in this process, sharing specs in memory between steps
+sys.path.insert(0, str(ROOT))
+from pipeline import STEPS, Pipeline
+from spec_io import dump_yaml, json_sibling, load_spec
+
+pipeline = Pipeline(str(ROOT))
+# Pipeline steps read each other's outputs, so they run one at a time
+pipeline_lock = threading.Lock()
+
+# Steps run in the background; DASHBOARD_WORKERS of them at once
+jobs = JobQueue(workers=int(os.environ.get("DASHBOARD_WORKERS", "4")))
+
+COMMANDS = {
+    "record_har": [sys.executable, "record_wp_har.py"],
+}
+
+def pipeline_job(steps, force=False):
+    def run(job):
+        for step in steps:
+            job.check_cancelled()
+            with pipeline_lock:
+                pipeline.run([step], force=force)
+    return run
+
 @app.route("/")
 def index():
     return render_template("index.html")
@@ -14,23 +42,69 @@ def index():
 def run_step():
     data = request.get_json()
     step = data.get("step")
-    try:
-        if step == "static":
-            result = subprocess.run(["php", "StaticRouteExtractor.php"], cwd=ROOT, capture_output=True, text=True)
-        elif step == "merge_openapi":
-            result = subprocess.run(["python3", "merge_openapi.py"], cwd=ROOT, capture_output=True, text=True)
-        elif step == "record_har":
-            result = subprocess.run(["python3", "record_wp_har.py"], cwd=ROOT, capture_output=True, text=True)
-        elif step == "extract_har":
-            result = subprocess.run(["python3", "extract_full_rest_from_har.py"], cwd=ROOT, capture_output=True, text=True)
-        elif step == "super_merge":
-            result = subprocess.run(["python3", "super_merge_openapi.py"], cwd=ROOT, capture_output=True, text=True)
-        else:
-            return jsonify(success=False, error="Unknown step"), 400
-
-        return jsonify(success=result.returncode == 0, output=result.stdout, error=result.stderr)
-    except Exception as e:
-        return jsonify(success=False, error=str(e))
+    # Steps whose inputs haven't changed since their last run are skipped unless forced
+    force = bool(data.get("force"))
+    if step in COMMANDS:
+        # A recording depends on the live site, so it always runs
+        job = jobs.submit(step, command=COMMANDS[step], cwd=ROOT)
+    elif step in STEPS:
+        job = jobs.submit(step, target=pipeline_job([step], force))
+    elif step == "pipeline":
+        job = jobs.submit(step, target=pipeline_job(STEPS, force))
+    else:
+        return jsonify(success=False, error="Unknown step"), 400
+    return jsonify(success=True, job=job.to_dict()), 202
+
+@app.route("/jobs")
+def list_jobs():
+    return jsonify(jobs=[job.to_dict() for job in jobs.list()])
+
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify(success=False, error="Unknown job"), 404
+    return jsonify(job.to_dict())
+
+@app.route("/jobs/<job_id>/cancel", methods=["POST"])
+def cancel_job(job_id):
+    job = jobs.cancel(job_id)
+    if job is None:
+        return jsonify(success=False, error="Unknown job"), 404
+    return jsonify(job.to_dict())
+
+@app.route("/jobs/<job_id>/events")
+def job_events(job_id):
+    """Server-Sent Events: one message per output line, then a 'done' event with the job status"""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify(success=False, error="Unknown job"), 404
+    # Reconnecting EventSources resume after the last line they got
+    last_id = request.headers.get("Last-Event-ID", "")
+    next_line = int(last_id) + 1 if last_id.isdigit() else 0
+
+    def stream():
+        nonlocal next_line
+        while True:
+            first, lines, done = job.lines_since(next_line)
+            for number, line in enumerate(lines, first):
+                yield f"id: {number}\ndata: {line}\n\n"
+            next_line = first + len(lines)
+            if done and not lines:
+                yield f"event: done\ndata: {json.dumps(job.to_dict())}\n\n"
+                return
+            if not lines:
+                yield ": keep-alive\n\n"
+
+    return Response(stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def render_yaml(path):
+    """Pipeline intermediates are only saved as JSON; write their YAML when it is first asked for."""
+    json_path = json_sibling(str(path))
+    if os.path.exists(json_path) and (not path.exists() or os.path.getmtime(json_path) > path.stat().st_mtime):
+        spec = load_spec(json_path)
+        with open(path, "w", encoding="utf-8") as f:
+            dump_yaml(spec, f)
 
 @app.route("/download/<path:filename>")
 def download(filename):
@@ -38,6 +112,7 @@ def download(filename):
     if filename in ["static_routes_full.json", "static_routes_full_1.json"]:
         return send_from_directory(ROOT / "output", filename)
     elif filename == "merged_openapi.yaml":
+        render_yaml(ROOT / "output" / filename)
         return send_from_directory(ROOT / "output", filename)
     elif filename == "full_har_openapi.yaml" or filename == "full_har_endpoints.json":
         return send_from_directory(ROOT / "captures", filename)
@@ -47,4 +122,5 @@ def download(filename):
         return "File not found", 404
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    # threaded so event streams don't hold up other requests; no reloader, it would start a second job queue
+    app.run(debug=True, threaded=True, use_reloader=False)
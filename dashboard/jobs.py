@@ -0,0 +1,201 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Output lines kept per job; older ones are dropped (clients that fall behind skip ahead)
+MAX_JOB_LINES = 20000
+
+# Finished jobs kept for status queries
+MAX_FINISHED_JOBS = 100
+
+# Seconds a cancelled subprocess gets to exit after SIGTERM before it is killed
+TERMINATE_TIMEOUT = 10
+
+FINISHED = ("succeeded", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """One dashboard run: its status, captured output and cancellation flag."""
+
+    def __init__(self, step):
+        self.id = uuid.uuid4().hex[:12]
+        self.step = step
+        self.status = "queued"
+        self.error = ""
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.lines = []
+        # Absolute number of the first line still in self.lines
+        self.first_line = 0
+        # Text written since the last newline
+        self.partial = ""
+        self.process = None
+        self.cancel_requested = threading.Event()
+        self.changed = threading.Condition()
+
+    def write(self, text):
+        """Append output; an unterminated last line waits for the rest of it (or the end of the job)."""
+        with self.changed:
+            *complete, self.partial = (self.partial + text).split("\n")
+            self.lines.extend(line.rstrip("\r") for line in complete)
+            overflow = len(self.lines) - MAX_JOB_LINES
+            if overflow > 0:
+                del self.lines[:overflow]
+                self.first_line += overflow
+            self.changed.notify_all()
+
+    def set_status(self, status, error=""):
+        with self.changed:
+            self.status = status
+            self.error = error
+            if status == "running":
+                self.started = time.time()
+            elif status in FINISHED:
+                self.finished = time.time()
+                if self.partial:
+                    self.lines.append(self.partial)
+                    self.partial = ""
+            self.changed.notify_all()
+
+    def check_cancelled(self):
+        if self.cancel_requested.is_set():
+            raise JobCancelled()
+
+    def lines_since(self, line_number, timeout=15):
+        """Lines from absolute line_number on, waiting up to timeout for some; returns (first, lines, done)."""
+        with self.changed:
+            if line_number >= self.first_line + len(self.lines) and self.status not in FINISHED:
+                self.changed.wait(timeout)
+            start = max(line_number, self.first_line)
+            return start, self.lines[start - self.first_line:], self.status in FINISHED
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "step": self.step,
+            "status": self.status,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "lines": self.first_line + len(self.lines),
+        }
+
+
+class ThreadOutput:
+    """sys.stdout replacement sending each thread's writes to the job it is running, if any."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def write(self, text):
+        job = getattr(self.local, "job", None)
+        if job is None:
+            return self.stream.write(text)
+        job.write(text)
+        return len(text)
+
+    def flush(self):
+        if getattr(self.local, "job", None) is None:
+            self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class JobQueue:
+    """Runs dashboard steps on a bounded pool of background threads.
+
+    A job is either a command (run as a subprocess, its stdout/stderr read line
+    by line) or a Python callable taking the job (its print output captured
+    through ThreadOutput). Commands are cancelled by terminating the process;
+    callables by raising JobCancelled at their next job.check_cancelled().
+    """
+
+    def __init__(self, workers=4):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self.jobs = {}
+        self.lock = threading.Lock()
+        if not isinstance(sys.stdout, ThreadOutput):
+            sys.stdout = ThreadOutput(sys.stdout)
+        self.output = sys.stdout
+
+    def submit(self, step, command=None, target=None, cwd=None):
+        job = Job(step)
+        with self.lock:
+            self.jobs[job.id] = job
+            self._forget_finished()
+        self.executor.submit(self._run, job, command, target, cwd)
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def list(self):
+        return sorted(self.jobs.values(), key=lambda job: job.created, reverse=True)
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None or job.status in FINISHED:
+            return job
+        job.cancel_requested.set()
+        if job.status == "queued":
+            job.set_status("cancelled")
+        elif job.process is not None:
+            job.process.terminate()
+            # Escalate if it ignores SIGTERM
+            threading.Timer(TERMINATE_TIMEOUT, self._kill, (job.process,)).start()
+        return job
+
+    @staticmethod
+    def _kill(process):
+        if process.poll() is None:
+            process.kill()
+
+    def _forget_finished(self):
+        finished = [job for job in self.jobs.values() if job.status in FINISHED]
+        finished.sort(key=lambda job: job.finished)
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job.id]
+
+    def _run(self, job, command, target, cwd):
+        if job.cancel_requested.is_set():
+            return
+        job.set_status("running")
+        try:
+            if command is not None:
+                returncode = self._run_command(job, command, cwd)
+                job.check_cancelled()
+                if returncode != 0:
+                    job.set_status("failed", f"exited with status {returncode}")
+                    return
+            else:
+                self.output.local.job = job
+                try:
+                    target(job)
+                finally:
+                    self.output.local.job = None
+            job.set_status("succeeded")
+        except JobCancelled:
+            job.write("Cancelled.\n")
+            job.set_status("cancelled")
+        except Exception as e:
+            job.set_status("failed", f"{type(e).__name__}: {e}")
+
+    def _run_command(self, job, command, cwd):
+        env = dict(os.environ, PYTHONUNBUFFERED="1")
+        job.process = subprocess.Popen(command, cwd=cwd, env=env, stdout=subprocess.PIPE,
+                                       stderr=subprocess.STDOUT, text=True, bufsize=1)
+        for line in job.process.stdout:
+            job.write(line)
+        return job.process.wait()
@@ -1,8 +1,18 @@
+import argparse
+import base64
+import binascii
+import hashlib
 import json
-import sys
+import os
 import re
-import yaml
+import sqlite3
+from collections import deque
+from pathlib import Path
+from multiprocessing import Pool
 from urllib.parse import urlparse
+from path_normalizer import DEFAULT_ROUTES_FILE, PathNormalizer
+from schema_inference import finalize_schema, infer_schema, merge_schemas
+from spec_io import dump_yaml
 
 # Headers considered "noise"
 NOISE_HEADERS = {
@@ -15,11 +25,23 @@ NOISE_HEADERS = {
 # Max request body length before truncating
 MAX_BODY_LENGTH = 2000
 
-# Regex for detecting numeric IDs and UUIDs
-ID_PATTERN = re.compile(r"/\d+")
-UUID_PATTERN = re.compile(
-    r"/[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.I
-)
+# Path template placeholders, e.g. {id} or {field_id}
+PATH_PARAM_PATTERN = re.compile(r"\{(\w+)\}")
+
+# Characters read per chunk when streaming a HAR file
+STREAM_CHUNK_SIZE = 1 << 20
+
+# Entries handed to a worker process at a time in --workers mode
+SHARD_SIZE = 256
+
+# Bump when the shape of cached operation fragments changes
+CACHE_VERSION = 5
+
+# Response bodies larger than this are spilled to the sample store (bytes)
+SPILL_THRESHOLD = 64 * 1024
+
+# Spilled samples referenced as examples per response content type
+MAX_EXAMPLES_PER_MEDIA = 3
 
 # Methods that can have request bodies
 METHODS_WITH_BODY = {"POST", "PUT", "PATCH"}
@@ -82,33 +104,46 @@ def parse_json_body(body):
         return None
 
 
+path_normalizer = None
+
+
+def configure_path_normalizer(routes_file=DEFAULT_ROUTES_FILE):
+    """Load the known static routes that normalize_path matches against."""
+    global path_normalizer
+    path_normalizer = PathNormalizer.from_routes_file(routes_file)
+
+
 def normalize_path(path: str) -> str:
-    """Replace IDs and UUIDs in the path with placeholders."""
-    path = ID_PATTERN.sub("/{id}", path)
-    path = UUID_PATTERN.sub("/{uuid}", path)
-    return path
+    """Replace IDs, UUIDs and known route parameters in the path with placeholders."""
+    if path_normalizer is None:
+        configure_path_normalizer()
+    return path_normalizer.normalize(path)
 
 
 def extract_parameters_from_path(path: str):
     """Extract OAS parameters from path for Test tool compatibility."""
     parameters = []
-    
-    if "{id}" in path:
-        parameters.append({
-            "name": "id",
-            "in": "path",
-            "required": True,
-            "schema": {"type": "integer"}
-        })
-    
-    if "{uuid}" in path:
+    seen = set()
+
+    for name in PATH_PARAM_PATTERN.findall(path):
+        if name in seen:
+            continue
+        seen.add(name)
+
+        if name == "uuid":
+            schema = {"type": "string", "format": "uuid"}
+        elif name == "id" or name.endswith("_id") or name.endswith("Id"):
+            schema = {"type": "integer"}
+        else:
+            schema = {"type": "string"}
+
         parameters.append({
-            "name": "uuid", 
+            "name": name,
             "in": "path",
             "required": True,
-            "schema": {"type": "string", "format": "uuid"}
+            "schema": schema
         })
-    
+
     return parameters
 
 
@@ -173,28 +208,14 @@ def create_oas_request_body(req_mime, body_schema):
 
 
 def create_response_schema(res_mime, res_body):
-    """Create basic response schema from response body."""
+    """Infer a schema node from the full response body (see schema_inference)."""
     if not res_body or not res_mime or "application/json" not in res_mime:
         return None
-    
+
     try:
-        parsed_json = json.loads(res_body)
-        if isinstance(parsed_json, dict):
-            schema = {"type": "object", "properties": {}}
-            for key, value in parsed_json.items():
-                if isinstance(value, bool):
-                    schema["properties"][key] = {"type": "boolean"}
-                elif isinstance(value, int):
-                    schema["properties"][key] = {"type": "integer"}
-                elif isinstance(value, (list, dict)):
-                    schema["properties"][key] = {"type": "array" if isinstance(value, list) else "object"}
-                else:
-                    schema["properties"][key] = {"type": "string"}
-            return schema
-    except:
-        pass
-    
-    return None
+        return infer_schema(json.loads(res_body))
+    except ValueError:
+        return None
 
 
 def create_oas_operation(method, request_entry, response_entry, security_requirement):
@@ -228,118 +249,464 @@ def create_oas_operation(method, request_entry, response_entry, security_require
     return operation
 
 
-def extract_rest_endpoints_from_har(har_file, output_file):
+def iter_har_entries_streaming(har_file, chunk_size=STREAM_CHUNK_SIZE, log_fields=None):
+    """Yield log.entries one at a time without loading the whole HAR into memory.
+
+    The other log fields (pages, creator, ...) are stored in log_fields, if given.
+    """
+    with open(har_file, "r", encoding="utf-8") as f:
+        for _, _, entry in walk_har_entries(f, chunk_size, log_fields):
+            yield entry
+
+
+def iter_har_entry_spans(har_file, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield (start, end, entry) with byte offsets of each entry in the HAR file.
+
+    The file is read as latin-1 so character offsets equal byte offsets; string
+    values in the yielded entries are therefore not UTF-8 decoded. Re-read the
+    byte range to get the exact entry.
+    """
+    with open(har_file, "r", encoding="latin-1") as f:
+        yield from walk_har_entries(f, chunk_size)
+
+
+def walk_har_entries(f, chunk_size=STREAM_CHUNK_SIZE, log_fields=None):
+    """Incrementally walk log.entries in an open HAR file, yielding (start, end, entry)."""
+    decoder = json.JSONDecoder()
+
+    buf = ""
+    pos = 0
+    consumed = 0
+    eof = False
+
+    def fill(size=chunk_size):
+        nonlocal buf, pos, eof, consumed
+        chunk = f.read(size)
+        if not chunk:
+            eof = True
+        consumed += pos
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    def skip_ws():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            fill()
+
+    def expect(char):
+        nonlocal pos
+        skip_ws()
+        if pos >= len(buf) or buf[pos] != char:
+            raise ValueError(f"Invalid HAR file: expected '{char}' at offset {pos}")
+        pos += 1
+
+    def decode_value():
+        nonlocal pos
+        while True:
+            skip_ws()
+            # Keep a little lookahead so scalars aren't cut at a chunk boundary
+            if not eof and len(buf) - pos < 64:
+                fill()
+                continue
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # Double what is buffered of an incomplete value, so a huge entry
+                # is re-decoded O(log n) times rather than once per chunk
+                fill(max(chunk_size, len(buf) - pos))
+                continue
+            pos = end
+            return value
+
+    def iter_object_keys():
+        """Walk the keys of the object at the cursor, leaving it on each value."""
+        nonlocal pos
+        expect("{")
+        skip_ws()
+        if buf[pos:pos + 1] == "}":
+            pos += 1
+            return
+        while True:
+            key = decode_value()
+            expect(":")
+            yield key
+            skip_ws()
+            if buf[pos:pos + 1] == ",":
+                pos += 1
+                continue
+            expect("}")
+            return
+
+    fill()
+    for key in iter_object_keys():
+        if key != "log":
+            decode_value()
+            continue
+        for log_key in iter_object_keys():
+            if log_key != "entries":
+                value = decode_value()
+                if log_fields is not None:
+                    log_fields[log_key] = value
+                continue
+            expect("[")
+            skip_ws()
+            if buf[pos:pos + 1] == "]":
+                pos += 1
+                continue
+            while True:
+                skip_ws()
+                start = consumed + pos
+                entry = decode_value()
+                yield start, consumed + pos, entry
+                skip_ws()
+                if buf[pos:pos + 1] == ",":
+                    pos += 1
+                    continue
+                expect("]")
+                break
+
+
+def iter_har_entries(har_file, stream=False):
+    """Yield HAR entries, either from a full json.load or incrementally."""
+    if stream:
+        yield from iter_har_entries_streaming(har_file)
+        return
+
     with open(har_file, "r", encoding="utf-8") as f:
         har_data = json.load(f)
 
-    paths = {}
-    server = None
-    security_schemes = {}
-    endpoints_requiring_auth = set()
+    yield from har_data.get("log", {}).get("entries", [])
 
-    for entry in har_data.get("log", {}).get("entries", []):
-        request = entry.get("request", {})
-        response = entry.get("response", {})
-        url = request.get("url", "")
 
-        if "/wp-json/" not in url:
-            continue
+def new_extraction_state():
+    """Create the accumulator that HAR entries are folded into."""
+    return {
+        "server": None,
+        "paths": {},
+        "security_schemes": {},
+        "endpoints_requiring_auth": set(),
+        "new_fragments": {},
+    }
 
-        parsed_url = urlparse(url)
-        if not server:
-            server = f"{parsed_url.scheme}://{parsed_url.netloc}/wp-json"
-
-        path = parsed_url.path.replace("/wp-json", "", 1)
-        if not path.startswith("/"):
-            path = "/" + path
-
-        normalized_path = normalize_path(path)
-        method = request.get("method", "GET").upper()
-
-        all_req_headers = {h["name"]: h["value"] for h in request.get("headers", [])}
-        
-        security_scheme = detect_security_scheme(all_req_headers)
-        if security_scheme:
-            scheme_type = security_scheme["type"]
-            if scheme_type == "http":
-                security_key = "basic_auth" if security_scheme.get("scheme") == "basic" else "bearer_auth"
-            else:
-                security_key = "api_key"
-            
-            security_schemes[security_key] = security_scheme
-            endpoints_requiring_auth.add((normalized_path, method))
-
-        req_headers = clean_headers_for_testing(all_req_headers)
-
-        post_data = request.get("postData", {})
-        req_body = post_data.get("text", None)
-        req_mime = post_data.get("mimeType", None)
-
-        parsed_body = None
-        body_schema = None
-        
-        if method in METHODS_WITH_BODY and req_body and req_mime:
-            if "multipart/form-data" in req_mime:
-                parsed_body = parse_multipart_form_data(req_body, req_mime)
-            elif "application/x-www-form-urlencoded" in req_mime:
-                parsed_body = parse_form_urlencoded(req_body)
-            elif "application/json" in req_mime:
-                parsed_body = parse_json_body(req_body)
-            
-            if parsed_body:
-                body_schema = create_body_schema(parsed_body)
 
-        if req_body and len(req_body) > MAX_BODY_LENGTH and "multipart" not in str(req_body):
-            req_body = req_body[:MAX_BODY_LENGTH] + "... [truncated]"
+def read_response_body(content):
+    """Response body as bytes, decoding base64 when the HAR content says so."""
+    text = content.get("text")
+    if not text:
+        return None
 
-        res_content = response.get("content", {}).get("text")
-        res_mime = response.get("content", {}).get("mimeType")
-        status = response.get("status", 0)
+    if content.get("encoding") == "base64":
+        try:
+            return base64.b64decode(text)
+        except (binascii.Error, ValueError):
+            return None
 
-        if not res_content:
-            continue
+    return text.encode("utf-8")
 
-        if res_content and len(res_content) > MAX_BODY_LENGTH:
-            if '"namespace":"' in res_content and '"routes":' in res_content:
-                res_content = '{"truncated": true, "message": "WordPress REST API schema truncated for brevity", "original_length": ' + str(len(res_content)) + '}'
-            else:
-                res_content = res_content[:MAX_BODY_LENGTH] + "... [truncated]"
 
-        response_schema = create_response_schema(res_mime, res_content)
+def entry_fingerprint(method, normalized_path, req_mime, req_body, res_mime, status, res_digest):
+    """Hash everything an operation fragment is derived from."""
+    digest = hashlib.sha256()
+    for part in (CACHE_VERSION, method, normalized_path, req_mime, res_mime, status, res_digest):
+        digest.update(f"{part}\0".encode("utf-8"))
+    digest.update(hashlib.sha256((req_body or "").encode("utf-8")).digest())
+    return digest.hexdigest()
+
+
+class SampleStore:
+    """Content-addressed directory of large response bodies, so they never stay in memory.
+
+    Examples reference the samples by a URL relative to spec_dir (where the spec
+    is written), or by a file:// URI when the spec location isn't known.
+    """
+
+    def __init__(self, root, spec_dir=None):
+        self.root = root
+        self.spec_dir = spec_dir
+
+    def url(self, path):
+        if self.spec_dir is None:
+            return Path(path).resolve().as_uri()
+        return Path(os.path.relpath(path, self.spec_dir)).as_posix()
+
+    def put(self, digest, body):
+        path = os.path.join(self.root, digest[:2], digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+        return path
+
+
+class FragmentCache:
+    """Persistent map of entry fingerprint -> operation fragment, backed by SQLite."""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS fragments (key TEXT PRIMARY KEY, fragment TEXT NOT NULL)")
+
+    def get(self, key):
+        row = self.conn.execute("SELECT fragment FROM fragments WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_many(self, fragments):
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO fragments (key, fragment) VALUES (?, ?)", fragments.items())
+
+    def close(self):
+        self.conn.close()
+
+
+def fold_entry(state, entry, cache=None, samples=None):
+    """Fold a single HAR entry into the extraction state."""
+    paths = state["paths"]
+    security_schemes = state["security_schemes"]
+    endpoints_requiring_auth = state["endpoints_requiring_auth"]
+
+    request = entry.get("request", {})
+    response = entry.get("response", {})
+    url = request.get("url", "")
+
+    if "/wp-json/" not in url:
+        return
+
+    parsed_url = urlparse(url)
+    if not state["server"]:
+        state["server"] = f"{parsed_url.scheme}://{parsed_url.netloc}/wp-json"
+
+    path = parsed_url.path.replace("/wp-json", "", 1)
+    if not path.startswith("/"):
+        path = "/" + path
+
+    normalized_path = normalize_path(path)
+    method = request.get("method", "GET").upper()
+
+    all_req_headers = {h["name"]: h["value"] for h in request.get("headers", [])}
+
+    security_scheme = detect_security_scheme(all_req_headers)
+    if security_scheme:
+        scheme_type = security_scheme["type"]
+        if scheme_type == "http":
+            security_key = "basic_auth" if security_scheme.get("scheme") == "basic" else "bearer_auth"
+        else:
+            security_key = "api_key"
+
+        security_schemes[security_key] = security_scheme
+        endpoints_requiring_auth.add((normalized_path, method))
+
+    req_headers = clean_headers_for_testing(all_req_headers)
+
+    post_data = request.get("postData", {})
+    req_body = post_data.get("text", None)
+    req_mime = post_data.get("mimeType", None)
+
+    res_body = read_response_body(response.get("content", {}))
+    res_mime = response.get("content", {}).get("mimeType")
+    status = response.get("status", 0)
+
+    if not res_body:
+        return
+
+    res_digest = hashlib.sha256(res_body).hexdigest()
+
+    # Unchanged entries reuse the operation built on a previous run
+    key = None
+    operation = None
+    if cache is not None:
+        key = entry_fingerprint(method, normalized_path, req_mime, req_body, res_mime, status, res_digest)
+        operation = cache.get(key)
+
+    if operation is None:
+        operation = build_operation(method, normalized_path, req_body, req_mime, res_body, res_mime, status)
+        if key is not None:
+            state["new_fragments"][key] = json.dumps(operation)
+
+    # Examples are attached after caching, so cached fragments never depend on
+    # (or point into) a sample store, and cache hits spill like misses do
+    if samples is not None and len(res_body) > SPILL_THRESHOLD:
+        sample_path = samples.put(res_digest, res_body)
+        media = operation["responses"][str(status)]["content"][res_mime or "application/json"]
+        media["examples"] = {res_digest[:12]: {"externalValue": samples.url(sample_path)}}
+
+    # Only the digest and schema node outlive this call; the body goes with the entry
+    del res_body
+
+    add_operation(paths, normalized_path, method, operation)
+
+
+def build_operation(method, normalized_path, req_body, req_mime, res_body, res_mime, status):
+    """Build the OpenAPI operation for one entry (the expensive, cacheable part)."""
+    parsed_body = None
+    body_schema = None
+
+    if method in METHODS_WITH_BODY and req_body and req_mime:
+        if "multipart/form-data" in req_mime:
+            parsed_body = parse_multipart_form_data(req_body, req_mime)
+        elif "application/x-www-form-urlencoded" in req_mime:
+            parsed_body = parse_form_urlencoded(req_body)
+        elif "application/json" in req_mime:
+            parsed_body = parse_json_body(req_body)
+
+        if parsed_body:
+            body_schema = create_body_schema(parsed_body)
+
+    if req_body and len(req_body) > MAX_BODY_LENGTH and "multipart" not in str(req_body):
+        req_body = req_body[:MAX_BODY_LENGTH] + "... [truncated]"
+
+    # Inference runs on the untruncated body; only the bounded schema node is kept
+    response_schema = create_response_schema(res_mime, res_body)
+
+    # Build request entry
+    request_entry = {}
+    parameters = extract_parameters_from_path(normalized_path)
+    if parameters:
+        request_entry["parameters"] = parameters
+
+    # Create OAS request body
+    if method in METHODS_WITH_BODY:
+        oas_request_body = create_oas_request_body(req_mime, body_schema)
+        if oas_request_body:
+            request_entry["requestBody"] = oas_request_body
+
+    # Build response entry; the schema stays an inference node until build_openapi_spec
+    response_entry = {"status": status, "mimeType": res_mime or "application/json", "schema": response_schema}
+
+    # Create OpenAPI operation (security is attached in build_openapi_spec once
+    # every entry has been seen, so shards can be folded independently)
+    return create_oas_operation(method, request_entry, response_entry, [])
+
+
+def merge_operation(target, operation):
+    """Fold operation into target: request details from the latest sample, responses merged."""
+    for key in ("parameters", "requestBody"):
+        if key in operation:
+            target[key] = operation[key]
+
+    for status, response in operation["responses"].items():
+        target_response = target["responses"].setdefault(status, {"description": response["description"], "content": {}})
+        for mime, media in response["content"].items():
+            target_media = target_response["content"].setdefault(mime, {"schema": None})
+            target_media["schema"] = merge_schemas(target_media["schema"], media["schema"])
+
+            for name, example in media.get("examples", {}).items():
+                examples = target_media.setdefault("examples", {})
+                if name not in examples and len(examples) < MAX_EXAMPLES_PER_MEDIA:
+                    examples[name] = example
+
+    return target
+
+
+def add_operation(paths, normalized_path, method, operation):
+    """Add one entry's operation to paths, merging with earlier samples of it."""
+    methods = paths.setdefault(normalized_path, {})
+    existing = methods.get(method.lower())
+    if existing is None:
+        methods[method.lower()] = operation
+    else:
+        merge_operation(existing, operation)
+
+
+def merge_extraction_states(target, shard):
+    """Merge a shard's state into target, in the same order the entries came in."""
+    if not target["server"]:
+        target["server"] = shard["server"]
+
+    for path, methods in shard["paths"].items():
+        for method, operation in methods.items():
+            add_operation(target["paths"], path, method, operation)
+
+    target["security_schemes"].update(shard["security_schemes"])
+    target["endpoints_requiring_auth"] |= shard["endpoints_requiring_auth"]
+    target["new_fragments"].update(shard["new_fragments"])
+    return target
+
+
+_worker_cache = None
+_worker_samples = None
+
+
+def init_worker(cache_path, routes_file, samples_dir, spec_dir):
+    """Load known routes and open the fragment cache and sample store in each worker."""
+    global _worker_cache, _worker_samples
+    configure_path_normalizer(routes_file)
+    if cache_path:
+        _worker_cache = FragmentCache(cache_path)
+    if samples_dir:
+        _worker_samples = SampleStore(samples_dir, spec_dir)
+
+
+def fold_shard(entries):
+    """Fold a batch of entries into a fresh state (runs in a worker process)."""
+    state = new_extraction_state()
+    for entry in entries:
+        fold_entry(state, entry, cache=_worker_cache, samples=_worker_samples)
+    return state
+
+
+def iter_shards(entries, shard_size=SHARD_SIZE):
+    """Group REST entries into lists of shard_size, skipping non-REST traffic early."""
+    shard = []
+    for entry in entries:
+        if "/wp-json/" not in entry.get("request", {}).get("url", ""):
+            continue
+        shard.append(entry)
+        if len(shard) >= shard_size:
+            yield shard
+            shard = []
+    if shard:
+        yield shard
+
+
+def fold_entries_parallel(entries, workers, cache_path=None, routes_file=DEFAULT_ROUTES_FILE, samples_dir=None,
+                          spec_dir=None):
+    """Fold entries across a process pool, merging shard results in input order."""
+    state = new_extraction_state()
+    pending = deque()
+
+    with Pool(processes=workers, initializer=init_worker, initargs=(cache_path, routes_file, samples_dir, spec_dir)) as pool:
+        # Only keep a couple of shards per worker in flight so a streamed HAR
+        # is never read ahead into the task queue
+        for shard in iter_shards(entries):
+            pending.append(pool.apply_async(fold_shard, (shard,)))
+            if len(pending) >= workers * 2:
+                merge_extraction_states(state, pending.popleft().get())
+
+        while pending:
+            merge_extraction_states(state, pending.popleft().get())
+
+    return state
+
+
+def build_openapi_spec(state):
+    """Build the OpenAPI document from a finished extraction state."""
+    server = state["server"]
+    security_schemes = state["security_schemes"]
+
+    # Render the merged response schemas
+    for methods in state["paths"].values():
+        for operation in methods.values():
+            for response in operation["responses"].values():
+                for media in response["content"].values():
+                    node = media["schema"]
+                    media["schema"] = finalize_schema(node) if node is not None else {"type": "object"}
+
+    # Create security requirements
+    if security_schemes:
+        scheme_type = next(iter(security_schemes))
+        for normalized_path, method in state["endpoints_requiring_auth"]:
+            operation = state["paths"].get(normalized_path, {}).get(method.lower())
+            if operation is not None:
+                operation["security"] = [{scheme_type: []}]
 
-        # Build request entry
-        request_entry = {}
-        parameters = extract_parameters_from_path(normalized_path)
-        if parameters:
-            request_entry["parameters"] = parameters
-            
-        # Create OAS request body
-        if method in METHODS_WITH_BODY:
-            oas_request_body = create_oas_request_body(req_mime, body_schema)
-            if oas_request_body:
-                request_entry["requestBody"] = oas_request_body
-
-        # Build response entry
-        response_entry = {"status": status, "mimeType": res_mime or "application/json"}
-        if response_schema:
-            response_entry["schema"] = response_schema
-
-        # Create security requirement
-        security_requirement = []
-        if (normalized_path, method) in endpoints_requiring_auth and security_schemes:
-            scheme_type = list(security_schemes.keys())[0]
-            security_requirement = [{scheme_type: []}]
-
-        # Create OpenAPI operation
-        operation = create_oas_operation(method, request_entry, response_entry, security_requirement)
-        
-        # Add to paths
-        if normalized_path not in paths:
-            paths[normalized_path] = {}
-        
-        paths[normalized_path][method.lower()] = operation
-
-    # Build proper OpenAPI structure
     output = {
         "openapi": "3.0.3",
         "info": {
@@ -348,13 +715,54 @@ def extract_rest_endpoints_from_har(har_file, output_file):
             "version": "1.0.0"
         },
         "servers": [{"url": server if server else "/wp-json", "description": "Development server"}],
-        "paths": paths,
+        "paths": state["paths"],
     }
 
     # Add components if security schemes exist
     if security_schemes:
         output["components"] = {"securitySchemes": security_schemes}
 
+    return output
+
+
+def extract_openapi_spec(har_file, stream=False, workers=1, cache_file=None,
+                         routes_file=DEFAULT_ROUTES_FILE, samples_dir=None, spec_dir=None):
+    """Build the OpenAPI spec for a HAR file without writing it anywhere.
+
+    spec_dir is where the spec will be saved, so spilled samples can be linked relative to it.
+    """
+    configure_path_normalizer(routes_file)
+    entries = iter_har_entries(har_file, stream=stream)
+    cache = FragmentCache(cache_file) if cache_file else None
+    samples = SampleStore(samples_dir, spec_dir) if samples_dir else None
+
+    if workers > 1:
+        state = fold_entries_parallel(entries, workers, cache_path=cache_file, routes_file=routes_file,
+                                      samples_dir=samples_dir, spec_dir=spec_dir)
+    else:
+        state = new_extraction_state()
+
+        # Entries are folded one by one and dropped, so in streaming mode peak
+        # memory is bounded by the largest single entry rather than the whole HAR
+        for entry in entries:
+            fold_entry(state, entry, cache=cache, samples=samples)
+
+    if cache:
+        cache.put_many(state["new_fragments"])
+        cache.close()
+        print(f" Fragment cache: {len(state['new_fragments'])} new or changed entries")
+
+    return build_openapi_spec(state)
+
+
+def extract_rest_endpoints_from_har(har_file, output_file, stream=False, workers=1, cache_file=None,
+                                    routes_file=DEFAULT_ROUTES_FILE, samples_dir=None):
+    output = extract_openapi_spec(har_file, stream=stream, workers=workers, cache_file=cache_file,
+                                  routes_file=routes_file, samples_dir=samples_dir,
+                                  spec_dir=os.path.dirname(os.path.abspath(output_file)))
+    paths = output["paths"]
+    security_schemes = output.get("components", {}).get("securitySchemes")
+
     # Save JSON
     with open(output_file, "w", encoding="utf-8") as out:
         json.dump(output, out, indent=2, ensure_ascii=False)
@@ -363,16 +771,30 @@ def extract_rest_endpoints_from_har(har_file, output_file):
     yaml_output_file = output_file.replace('.json', '.yaml')
     
     with open(yaml_output_file, "w", encoding="utf-8") as out:
-        yaml.dump(output, out, default_flow_style=False, allow_unicode=True, sort_keys=False, width=80)
+        dump_yaml(output, out, width=80)
 
     print(f" Extracted {len(paths)} endpoints from {har_file}")
     if security_schemes:
         print(f" Security schemes detected: {list(security_schemes.keys())}")
     print(f" Saved JSON spec to {output_file}")
     print(f" Saved YAML spec to {yaml_output_file}")
+    return output
 
 
 if __name__ == "__main__":
-    har_file = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_HAR_FILE
-    output_file = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_OUTPUT_FILE
-    extract_rest_endpoints_from_har(har_file, output_file)
+    parser = argparse.ArgumentParser(description="Extract an OpenAPI spec from WordPress REST traffic in a HAR file")
+    parser.add_argument("har_file", nargs="?", default=DEFAULT_HAR_FILE)
+    parser.add_argument("output_file", nargs="?", default=DEFAULT_OUTPUT_FILE)
+    parser.add_argument("--stream", action="store_true",
+                        help="parse log.entries incrementally instead of loading the whole HAR")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes to fold entries with")
+    parser.add_argument("--cache", metavar="CACHE_FILE",
+                        help="reuse operations built for unchanged entries from this cache file")
+    parser.add_argument("--routes", default=DEFAULT_ROUTES_FILE,
+                        help="static route list used to name path parameters")
+    parser.add_argument("--samples-dir", metavar="DIR",
+                        help="spill response bodies over 64KB here and reference them as examples")
+    args = parser.parse_args()
+    extract_rest_endpoints_from_har(args.har_file, args.output_file, stream=args.stream, workers=args.workers,
+                                    cache_file=args.cache, routes_file=args.routes, samples_dir=args.samples_dir)
@@ -1,57 +1,211 @@
+import argparse
+import csv
+import glob
+import gzip
 import json
 import os
-from urllib.parse import urlparse
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from multiprocessing import Pool
+from urllib.parse import parse_qs, urlparse
 import requests
+from requests.adapters import HTTPAdapter
 import time
+from extract_full_rest_from_har import iter_har_entry_spans, read_response_body
+from path_normalizer import DEFAULT_ROUTES_FILE, PathNormalizer
+
+# Bump when the index table layout changes
+HAR_INDEX_VERSION = 2
+
+# Response keys that usually hold the media ID list, in order of preference
+MEDIA_KEYS = ['media_ids', 'mediaIds', 'ids', 'items', 'data', 'files', 'media', 'results']
+
+UUID_PATTERN = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.I)
+
+# Live fetch: WordPress caps per_page at 100
+LIVE_PER_PAGE = 100
+LIVE_CONCURRENCY = 8
+LIVE_RETRIES = 4
+LIVE_BACKOFF = 0.5  # seconds, doubled on every retry
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Console display: first DISPLAY_HEAD items, then DISPLAY_SAMPLE evenly spaced ones
+DISPLAY_HEAD = 10
+DISPLAY_SAMPLE = 10
+DISPLAY_WIDTH = 100
+
+# Responses with more top-level items than this are saved compact (C encoder) instead of indented
+PRETTY_MAX_ITEMS = 1000
+
+# Columns of the consolidated batch output
+BATCH_FIELDS = ['id', 'occurrences', 'har_file', 'entry_index', 'url', 'endpoint', 'json_path']
+
+class HarIndex:
+    """SQLite sidecar index over a HAR file's entries.
+
+    Built once per HAR (and rebuilt when the HAR changes), it maps method,
+    host, path, normalized path, status and mime type to the byte range of
+    each entry, so lookups use B-tree indexes and only matching entries are
+    read back and parsed.
+    """
+
+    def __init__(self, har_file_path, index_path=None):
+        self.har_file_path = har_file_path
+        self.index_path = index_path or f"{har_file_path}.idx.sqlite"
+        self.conn = sqlite3.connect(self.index_path)
+        if not self.is_current():
+            self.build()
+
+    def har_signature(self):
+        stat = os.stat(self.har_file_path)
+        return f"{HAR_INDEX_VERSION}:{stat.st_size}:{stat.st_mtime_ns}"
+
+    def is_current(self):
+        try:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'signature'").fetchone()
+        except sqlite3.OperationalError:
+            return False
+        return row is not None and row[0] == self.har_signature()
+
+    def build(self):
+        print(f"Indexing HAR file: {self.har_file_path}")
+        normalizer = PathNormalizer.from_routes_file(DEFAULT_ROUTES_FILE)
+
+        with self.conn:
+            self.conn.executescript("""
+                DROP TABLE IF EXISTS entries;
+                DROP TABLE IF EXISTS meta;
+                CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE entries (
+                    id INTEGER PRIMARY KEY,
+                    method TEXT, host TEXT, url TEXT, path TEXT, route TEXT, normalized_path TEXT,
+                    status INTEGER, mime TEXT, entry_offset INTEGER, entry_length INTEGER
+                );
+            """)
+
+            rows = []
+            for index, (start, end, entry) in enumerate(iter_har_entry_spans(self.har_file_path)):
+                request = entry.get('request', {})
+                response = entry.get('response', {})
+                url = latin1_to_utf8(request.get('url', ''))
+                parsed = urlparse(url)
+                rows.append((
+                    index, request.get('method', ''), parsed.netloc, url, parsed.path, rest_route(parsed),
+                    normalizer.normalize(parsed.path), response.get('status', 0),
+                    response.get('content', {}).get('mimeType', ''), start, end - start,
+                ))
+                if len(rows) >= 1000:
+                    self.conn.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                    rows = []
+            self.conn.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+            self.conn.executescript("""
+                CREATE INDEX entries_path ON entries (path);
+                CREATE INDEX entries_route ON entries (route);
+                CREATE INDEX entries_normalized_path ON entries (normalized_path);
+                CREATE INDEX entries_status ON entries (status);
+            """)
+            self.conn.execute("INSERT INTO meta VALUES ('signature', ?)", (self.har_signature(),))
+
+    def query(self, where="1", params=()):
+        cursor = self.conn.execute(
+            f"SELECT id, method, url, status, mime, entry_offset, entry_length FROM entries WHERE {where} ORDER BY id",
+            params,
+        )
+        columns = [c[0] for c in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
+
+    def find_endpoint(self, endpoint_path):
+        """Entries whose URL contains endpoint_path.
+
+        A path is looked up by prefix first, both as the URL path and as the
+        REST route (after /wp-json, or in ?rest_route=), which the indexes
+        answer; anything else falls back to a substring scan of the URLs.
+        """
+        if endpoint_path.startswith('/'):
+            path = urlparse(endpoint_path).path
+            rows = self.query("(path >= ? AND path < ?) OR (route >= ? AND route < ?)",
+                              (path, path + '\U0010ffff') * 2)
+            if rows:
+                return rows
+        return self.query("instr(url, ?) > 0", (endpoint_path,))
+
+    def find_by_normalized_path(self, normalized_path):
+        return self.query("normalized_path = ?", (normalized_path,))
+
+    def find_by_status(self, status):
+        return self.query("status = ?", (status,))
+
+    def paths(self):
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT path FROM entries ORDER BY path")]
+
+    def load_entry(self, row):
+        """Read a single entry back from the HAR by its byte range."""
+        with open(self.har_file_path, 'rb') as f:
+            f.seek(row['entry_offset'])
+            return json.loads(f.read(row['entry_length']).decode('utf-8'))
+
+    def close(self):
+        self.conn.close()
+
+def rest_route(parsed_url):
+    """The WordPress REST route a URL requests (/wp/v2/media for /wp-json/wp/v2/media or ?rest_route=...)."""
+    if '/wp-json' in parsed_url.path:
+        return parsed_url.path.split('/wp-json', 1)[1] or '/'
+    routes = parse_qs(parsed_url.query).get('rest_route')
+    return routes[0] if routes else None
+
+def latin1_to_utf8(value):
+    """Undo the latin-1 reading used for byte offsets on an indexed string."""
+    try:
+        return value.encode('latin-1').decode('utf-8')
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return value
 
 def read_har_file(har_file_path):
-    """Read and parse HAR file"""
+    """Open (building if needed) the index for a HAR file"""
     try:
-        with open(har_file_path, 'r', encoding='utf-8') as f:
-            har_data = json.load(f)
-        return har_data
+        return HarIndex(har_file_path)
     except FileNotFoundError:
         print(f"Error: HAR file not found at {har_file_path}")
         return None
-    except json.JSONDecodeError:
+    except (json.JSONDecodeError, ValueError):
         print(f"Error: Invalid JSON in HAR file at {har_file_path}")
         return None
 
-def extract_endpoint_from_har(har_data, endpoint_path):
+def extract_endpoint_from_har(har_index, endpoint_path):
     """Extract specific endpoint data from HAR file"""
     endpoint_data = []
     
-    if not har_data or 'log' not in har_data or 'entries' not in har_data['log']:
-        print("Error: Invalid HAR file structure")
-        return endpoint_data
-    
-    for entry in har_data['log']['entries']:
+    # Only the matching entries are read back from the HAR
+    for row in har_index.find_endpoint(endpoint_path):
+        entry = har_index.load_entry(row)
         request = entry.get('request', {})
         url = request.get('url', '')
         
-        # Check if this is the endpoint we're looking for
-        # Use 'in' instead of exact match to catch partial paths
-        if endpoint_path in url:
-            # Extract response content
-            response = entry.get('response', {})
-            content = response.get('content', {})
-            text = content.get('text', '')
-            
-            if text:
-                try:
-                    # Try to parse as JSON
-                    data = json.loads(text)
-                    endpoint_data.append({
-                        'url': url,
-                        'method': request.get('method', ''),
-                        'response': data
-                    })
-                except json.JSONDecodeError:
-                    endpoint_data.append({
-                        'url': url,
-                        'method': request.get('method', ''),
-                        'response_text': text  # Store as text if not JSON
-                    })
+        # Extract response content
+        body = read_response_body(entry.get('response', {}).get('content', {}))
+        
+        if body:
+            text = body.decode('utf-8', errors='replace')
+            try:
+                # Try to parse as JSON
+                data = json.loads(text)
+                endpoint_data.append({
+                    'entry_index': row['id'],
+                    'url': url,
+                    'method': request.get('method', ''),
+                    'response': data
+                })
+            except json.JSONDecodeError:
+                endpoint_data.append({
+                    'entry_index': row['id'],
+                    'url': url,
+                    'method': request.get('method', ''),
+                    'response_text': text  # Store as text if not JSON
+                })
     
     return endpoint_data
 
@@ -84,6 +238,84 @@ def get_media_ids_from_endpoint(base_url, endpoint_path, auth_token=None):
         print(f"Error parsing JSON response: {e}")
         return None
 
+def live_session(auth_token=None, concurrency=LIVE_CONCURRENCY):
+    """Keep-alive session sized for concurrent page fetches"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, concurrency))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+        'Accept': 'application/json',
+    })
+    if auth_token:
+        session.headers['Authorization'] = f'Bearer {auth_token}'
+    return session
+
+def fetch_page(session, url, page, per_page=LIVE_PER_PAGE, retries=LIVE_RETRIES):
+    """GET one page, retrying connection errors and 429/5xx with exponential backoff"""
+    for attempt in range(retries + 1):
+        try:
+            response = session.get(url, params={'page': page, 'per_page': per_page}, timeout=30)
+            if response.status_code not in RETRY_STATUSES:
+                response.raise_for_status()
+                return response
+            error = f"HTTP {response.status_code}"
+            retry_after = response.headers.get('Retry-After', '')
+        except requests.exceptions.HTTPError:
+            raise
+        except requests.exceptions.RequestException as e:
+            error = str(e)
+            retry_after = ''
+        
+        if attempt == retries:
+            raise requests.exceptions.RetryError(f"Page {page} failed after {retries + 1} attempts: {error}")
+        delay = float(retry_after) if retry_after.isdigit() else LIVE_BACKOFF * 2 ** attempt
+        time.sleep(delay)
+
+def page_ids(data):
+    """Flatten the ID arrays the heuristics pick out of one page"""
+    return [media_id for _, ids in select_id_arrays(data) for media_id in ids]
+
+def fetch_all_media_ids(base_url, endpoint_path, output_file, auth_token=None,
+                        per_page=LIVE_PER_PAGE, concurrency=LIVE_CONCURRENCY, retries=LIVE_RETRIES, append=False):
+    """Fetch every page of a collection, writing IDs to output_file as pages arrive.
+    
+    Page 1 gives X-WP-Total / X-WP-TotalPages; the remaining pages are fetched
+    concurrently. Endpoints without the headers are treated as a single page.
+    Returns the number of IDs written.
+    """
+    url = f"{base_url.rstrip('/')}/{endpoint_path.lstrip('/')}"
+    session = live_session(auth_token, concurrency)
+    written = 0
+    
+    try:
+        first = fetch_page(session, url, 1, per_page, retries)
+        total_pages = int(first.headers.get('X-WP-TotalPages') or 1)
+        total = first.headers.get('X-WP-Total')
+        print(f"Fetching {url}: {total or 'unknown'} item(s) over {total_pages} page(s)")
+        
+        with IdWriter(output_file, append) as writer:
+            writer.write(page_ids(first.json()))
+            
+            with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+                futures = {executor.submit(fetch_page, session, url, page, per_page, retries): page
+                           for page in range(2, total_pages + 1)}
+                for future in as_completed(futures):
+                    try:
+                        writer.write(page_ids(future.result().json()))
+                    except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+                        print(f"✗ Page {futures[future]} skipped: {e}")
+            written = writer.count
+    
+    except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+        print(f"Error calling endpoint: {e}")
+    finally:
+        session.close()
+    
+    print(f"✓ {written} IDs saved to: {output_file}")
+    return written
+
 def extract_and_display_media_ids(har_file_path, endpoint_path):
     """Main function to extract and display media IDs from HAR"""
     print(f"Reading HAR file: {har_file_path}")
@@ -91,17 +323,17 @@ def extract_and_display_media_ids(har_file_path, endpoint_path):
     print("-" * 60)
     
     # Read HAR file
-    har_data = read_har_file(har_file_path)
-    if not har_data:
+    har_index = read_har_file(har_file_path)
+    if not har_index:
         return
     
     # Extract endpoint data
-    endpoint_data = extract_endpoint_from_har(har_data, endpoint_path)
+    endpoint_data = extract_endpoint_from_har(har_index, endpoint_path)
     
     if not endpoint_data:
         print(f"No data found for endpoint containing: {endpoint_path}")
         print("\nChecking available endpoints in HAR file...")
-        list_all_endpoints(har_data)
+        list_all_endpoints(har_index)
         return
     
     print(f"Found {len(endpoint_data)} request(s) for endpoint containing: {endpoint_path}\n")
@@ -131,17 +363,12 @@ def display_media_ids(response_data):
     """Display media IDs from response data"""
     if isinstance(response_data, dict):
         # Look for common keys that might contain media IDs
-        media_keys = ['media_ids', 'mediaIds', 'ids', 'items', 'data', 'files', 'media', 'results']
-        
-        for key in media_keys:
+        for key in MEDIA_KEYS:
             if key in response_data:
                 media_data = response_data[key]
                 if isinstance(media_data, list):
                     print(f"  Found {len(media_data)} media IDs in '{key}':")
-                    for j, media_id in enumerate(media_data[:50], 1):  # Show first 50
-                        print(f"    {j}. {media_id}")
-                    if len(media_data) > 50:
-                        print(f"    ... and {len(media_data) - 50} more")
+                    display_sample(media_data)
                     
                     # Save these IDs to a separate file
                     save_media_ids_to_file(media_data, f"media_ids_extracted.txt")
@@ -153,10 +380,7 @@ def display_media_ids(response_data):
         
     elif isinstance(response_data, list):
         print(f"  Found {len(response_data)} items in list:")
-        for j, item in enumerate(response_data[:50], 1):
-            print(f"    {j}. {item}")
-        if len(response_data) > 50:
-            print(f"    ... and {len(response_data) - 50} more")
+        display_sample(response_data)
         
         # Save these IDs to a separate file
         save_media_ids_to_file(response_data, f"media_ids_extracted.txt")
@@ -164,6 +388,24 @@ def display_media_ids(response_data):
         print(f"  Response data type: {type(response_data)}")
         print(f"  Content preview: {str(response_data)[:200]}...")
 
+def display_sample(items, head=DISPLAY_HEAD, sample=DISPLAY_SAMPLE, indent="    "):
+    """Print a bounded view of a list: the first items, then an evenly spaced sample of the rest"""
+    shown = list(range(min(head, len(items))))
+    rest = len(items) - len(shown)
+    if rest > 0 and sample > 0:
+        step = max(1, rest // sample)
+        shown += list(range(len(shown) + step - 1, len(items), step))[:sample]
+    
+    previous = -1
+    for j in shown:
+        if j != previous + 1:
+            print(f"{indent}...")
+        text = str(items[j])
+        print(f"{indent}{j + 1}. {text[:DISPLAY_WIDTH]}{'...' if len(text) > DISPLAY_WIDTH else ''}")
+        previous = j
+    if len(items) > len(shown):
+        print(f"{indent}({len(items) - len(shown)} more not shown)")
+
 def find_arrays_in_dict(data, path=""):
     """Recursively find arrays in dictionary"""
     if isinstance(data, dict):
@@ -171,43 +413,112 @@ def find_arrays_in_dict(data, path=""):
             new_path = f"{path}.{key}" if path else key
             if isinstance(value, list):
                 print(f"    Found array at '{new_path}' with {len(value)} items")
-                print(f"    First 5 items:")
-                for i, item in enumerate(value[:5], 1):
-                    print(f"      {i}. {item}")
-                if len(value) > 5:
-                    print(f"      ... and {len(value) - 5} more")
+                display_sample(value, head=5, sample=0, indent="      ")
                 
-                # Ask if user wants to save these as media IDs
-                save_prompt = input(f"\n    Save these {len(value)} items as media IDs? (y/n): ").lower()
-                if save_prompt == 'y':
+                # Save it when every item looks like an ID (no prompt, so this runs unattended)
+                if id_array(value) is not None:
                     save_media_ids_to_file(value, f"media_ids_from_{key}.txt")
             elif isinstance(value, dict):
                 find_arrays_in_dict(value, new_path)
 
-def list_all_endpoints(har_data):
-    """List all unique endpoints found in HAR file"""
-    endpoints = set()
+def as_media_id(value):
+    """The ID a list item stands for (itself, or its 'id' field), or None"""
+    if isinstance(value, dict):
+        value = value.get('id')
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and (value.isdigit() or UUID_PATTERN.fullmatch(value)):
+        return value
+    return None
+
+def id_array(value):
+    """The IDs in a list when every item looks like one, else None"""
+    if not isinstance(value, list) or not value:
+        return None
+    ids = [as_media_id(item) for item in value]
+    if any(media_id is None for media_id in ids):
+        return None
+    return ids
+
+def select_id_arrays(data, path="$"):
+    """Pick the ID arrays in a response: a known media key wins, otherwise every ID-only array"""
+    ids = id_array(data)
+    if ids is not None:
+        return [(path, ids)]
+    if not isinstance(data, dict):
+        return []
     
-    for entry in har_data['log']['entries']:
-        request = entry.get('request', {})
-        url = request.get('url', '')
-        parsed_url = urlparse(url)
-        endpoints.add(parsed_url.path)
+    for key in MEDIA_KEYS:
+        ids = id_array(data.get(key))
+        if ids is not None:
+            return [(f"{path}.{key}", ids)]
     
+    found = []
+    for key, value in data.items():
+        if isinstance(value, (dict, list)):
+            found.extend(select_id_arrays(value, f"{path}.{key}"))
+    return found
+
+def list_all_endpoints(har_index):
+    """List all unique endpoints found in HAR file"""
     print("Available endpoints in HAR file:")
-    for endpoint in sorted(endpoints):
+    for endpoint in har_index.paths():
         print(f"  - {endpoint}")
 
+def open_output(filename, append=False):
+    """Text handle for an output file, gzip-compressed when the name ends in .gz"""
+    mode = 'at' if append else 'wt'
+    if filename.endswith('.gz'):
+        # Level 6 is several times faster than gzip's default 9 for a few percent in size
+        return gzip.open(filename, mode, compresslevel=6, encoding='utf-8', newline='')
+    return open(filename, mode, encoding='utf-8', newline='')
+
+def output_format(filename):
+    """Extension of an output filename, ignoring a trailing .gz"""
+    name = filename.lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    return os.path.splitext(name)[1]
+
+class IdWriter:
+    """Newline-delimited JSON output, one ID per line, written as IDs arrive"""
+
+    def __init__(self, filename, append=False):
+        self.filename = filename
+        self.file = open_output(filename, append)
+        self.count = 0
+
+    def write(self, ids):
+        self.file.writelines(json.dumps(media_id) + "\n" for media_id in ids)
+        self.file.flush()
+        self.count += len(ids)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
 def save_media_ids_to_file(media_ids, filename="media_ids_output.txt"):
-    """Save extracted media IDs to a file"""
-    with open(filename, 'w', encoding='utf-8') as f:
+    """Save extracted media IDs to a file (.ndjson/.jsonl, optionally .gz, for one ID per line)"""
+    if isinstance(media_ids, list) and output_format(filename) in ('.ndjson', '.jsonl'):
+        with IdWriter(filename) as writer:
+            writer.write(id_array(media_ids) or media_ids)
+        print(f"\n✓ {writer.count} media IDs saved to: {filename}")
+        return
+    
+    with open_output(filename) as f:
         f.write(f"Media IDs extracted at {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
         f.write(f"Total IDs: {len(media_ids)}\n")
         f.write("=" * 60 + "\n\n")
         
         if isinstance(media_ids, list):
-            for i, media_id in enumerate(media_ids, 1):
-                f.write(f"{i}. {media_id}\n")
+            f.writelines(f"{i}. {media_id}\n" for i, media_id in enumerate(media_ids, 1))
         elif isinstance(media_ids, dict):
             json.dump(media_ids, f, indent=2)
         else:
@@ -218,8 +529,10 @@ def save_media_ids_to_file(media_ids, filename="media_ids_output.txt"):
 def save_response_to_file(response_data, filename):
     """Save full response to a JSON file"""
     try:
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(response_data, f, indent=2)
+        # indent forces json's pure-Python encoder, so only pretty-print small responses
+        pretty = not isinstance(response_data, (list, dict)) or len(response_data) <= PRETTY_MAX_ITEMS
+        with open_output(filename) as f:
+            json.dump(response_data, f, indent=2 if pretty else None)
         print(f"✓ Full response saved to: {filename}")
     except Exception as e:
         print(f"✗ Error saving response to file: {e}")
@@ -275,15 +588,13 @@ def interactive_mode():
     if choice in ['2', '3']:
         # Extract base URL from HAR file first
         print("\nLooking for base URL in HAR file...")
-        har_data = read_har_file(har_file_path)
-        if har_data:
+        har_index = read_har_file(har_file_path)
+        if har_index:
             base_urls = set()
-            for entry in har_data['log']['entries'][:10]:  # Check first 10 entries
-                url = entry.get('request', {}).get('url', '')
-                if url and endpoint_path in url:
-                    parsed = urlparse(url)
-                    base_url = f"{parsed.scheme}://{parsed.netloc}"
-                    base_urls.add(base_url)
+            for row in har_index.find_endpoint(endpoint_path)[:10]:  # Check first 10 matches
+                parsed = urlparse(row['url'])
+                base_url = f"{parsed.scheme}://{parsed.netloc}"
+                base_urls.add(base_url)
             
             if base_urls:
                 print(f"Found possible base URLs in HAR: {', '.join(base_urls)}")
@@ -328,6 +639,75 @@ def interactive_mode():
         print(f"\nExtracting from HAR file: {har_file_path}")
         extract_and_display_media_ids(har_file_path, endpoint_path)
 
+def extract_ids_from_har(har_file_path, endpoint_patterns):
+    """Every ID found in one HAR's responses for the given endpoints, with provenance"""
+    har_index = read_har_file(har_file_path)
+    if not har_index:
+        return []
+    
+    records = []
+    try:
+        for pattern in endpoint_patterns:
+            for data in extract_endpoint_from_har(har_index, pattern):
+                if 'response' not in data:
+                    continue
+                for json_path, ids in select_id_arrays(data['response']):
+                    for media_id in ids:
+                        records.append({
+                            'id': media_id,
+                            'har_file': har_file_path,
+                            'entry_index': data['entry_index'],
+                            'url': data['url'],
+                            'endpoint': pattern,
+                            'json_path': json_path,
+                        })
+    finally:
+        har_index.close()
+    return records
+
+def dedupe_ids(records):
+    """Keep the first record per ID (5 and "5" are the same ID), counting repeats"""
+    unique = {}
+    for record in records:
+        key = str(record['id'])
+        if key in unique:
+            unique[key]['occurrences'] += 1
+        else:
+            unique[key] = dict(record, occurrences=1)
+    return list(unique.values())
+
+def save_batch_ids(records, output_file):
+    """Write the consolidated IDs as CSV (for a .csv filename) or JSONL"""
+    with open_output(output_file) as f:
+        if output_format(output_file) == '.csv':
+            writer = csv.DictWriter(f, fieldnames=BATCH_FIELDS)
+            writer.writeheader()
+            writer.writerows(records)
+        else:
+            for record in records:
+                f.write(json.dumps({field: record[field] for field in BATCH_FIELDS}, ensure_ascii=False) + "\n")
+    print(f"✓ {len(records)} unique IDs saved to: {output_file}")
+
+def batch_extract(har_patterns, endpoint_patterns, output_file, workers=1):
+    """Non-interactive extraction over every HAR matching the globs, one process per HAR"""
+    har_files = sorted({path for pattern in har_patterns for path in glob.glob(pattern, recursive=True)})
+    if not har_files:
+        print(f"Error: No HAR files match: {', '.join(har_patterns)}")
+        return []
+    
+    print(f"Extracting IDs for {len(endpoint_patterns)} endpoint(s) from {len(har_files)} HAR file(s)")
+    extract = partial(extract_ids_from_har, endpoint_patterns=endpoint_patterns)
+    if workers > 1 and len(har_files) > 1:
+        with Pool(min(workers, len(har_files))) as pool:
+            # imap keeps results in file order, so the first provenance per ID is stable
+            per_file = list(pool.imap(extract, har_files))
+    else:
+        per_file = [extract(path) for path in har_files]
+    
+    records = dedupe_ids(record for records in per_file for record in records)
+    save_batch_ids(records, output_file)
+    return records
+
 def direct_execution():
     """Direct execution with hardcoded values - UPDATED PATH AND ENDPOINT"""
     har_file_path = "/home/user/api-spec-generator/captures/wp.har"
@@ -363,12 +743,34 @@ def direct_execution():
     extract_and_display_media_ids(har_file_path, endpoint_path)
 
 if __name__ == "__main__":
-    # You can use this script in two ways:
+    # You can use this script in three ways:
+    #   python extract_media_ids.py                      direct execution with hardcoded values
+    #   python extract_media_ids.py --interactive        interactive mode
+    #   python extract_media_ids.py 'captures/*.har' -e /wp-json/media-ids/v1/get-all-media-ids -o ids.jsonl
+    #                                                    batch mode, no prompts
+    #   python extract_media_ids.py --live https://example.com -e /wp-json/wp/v2/media -o ids.ndjson.gz
+    #                                                    every page of a live collection
+    parser = argparse.ArgumentParser(description="Extract media IDs from HAR files")
+    parser.add_argument("har_files", nargs="*", help="HAR files or glob patterns (batch mode)")
+    parser.add_argument("-e", "--endpoint", action="append", dest="endpoints",
+                        help="Endpoint path prefix or URL substring; repeatable (default: /wp-json/media-ids/v1/get-all-media-ids)")
+    parser.add_argument("-o", "--output", default="media_ids.jsonl", help="Consolidated output, .jsonl or .csv (add .gz to compress)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processes for batch mode")
+    parser.add_argument("--interactive", action="store_true", help="Prompt for the HAR file, endpoint and mode")
+    parser.add_argument("--live", metavar="BASE_URL", help="Fetch every page of each endpoint from this site instead")
+    parser.add_argument("--token", help="Bearer token for --live")
+    parser.add_argument("--per-page", type=int, default=LIVE_PER_PAGE)
+    parser.add_argument("--concurrency", type=int, default=LIVE_CONCURRENCY, help="Concurrent page fetches for --live")
+    parser.add_argument("--retries", type=int, default=LIVE_RETRIES)
+    args = parser.parse_args()
     
-    # Method 1: Direct execution with hardcoded values
-    # Uncomment the line below for direct execution
-    direct_execution()
-    
-    # Method 2: Interactive mode
-    # Uncomment the line below for interactive mode
-    # interactive_mode()
+    if args.live:
+        for i, endpoint in enumerate(args.endpoints or ["/wp-json/wp/v2/media"]):
+            fetch_all_media_ids(args.live, endpoint, args.output, args.token, args.per_page,
+                                args.concurrency, args.retries, append=i > 0)
+    elif args.har_files:
+        batch_extract(args.har_files, args.endpoints or ["/wp-json/media-ids/v1/get-all-media-ids"], args.output, args.workers)
+    elif args.interactive:
+        interactive_mode()
+    else:
+        direct_execution()
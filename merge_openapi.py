@@ -1,21 +1,12 @@
-import json
-import yaml
 import os
 import sys
+from extract_full_rest_from_har import extract_parameters_from_path
+from openapi_merge import rename_path_parameters
+from path_normalizer import TemplateIndex, route_to_template, template_parameters
+from spec_io import load_spec, save_spec
 
-def load_spec(file_path):
-    """Load a JSON or YAML file using absolute path."""
-    if file_path.endswith(".json"):
-        with open(file_path, "r") as f:
-            spec = json.load(f)
-        # If it's a list, we'll process it directly
-        return spec
-    elif file_path.endswith((".yaml", ".yml")):
-        with open(file_path, "r") as f:
-            spec = yaml.safe_load(f)
-    else:
-        raise ValueError(f"Unsupported file type: {file_path}")
-    return spec
+# Route regexes that mean "integer" (anything else becomes a string pattern)
+INTEGER_PATTERNS = {r"\d+", r"[\d]+", "[0-9]+"}
 
 def extract_routes_from_json(json_data):
     """Extract routes from the JSON format - handles the specific object format"""
@@ -32,8 +23,9 @@ def extract_routes_from_json(json_data):
                 if not route:
                     continue
                     
-                # Create the full path
-                full_path = f"/{namespace}{route}".replace("//", "/")
+                # Create the full path, as an OpenAPI template: (?P<id>[\d]+) -> {id}
+                full_path, patterns = route_to_template(f"/{namespace.strip('/')}/{route.lstrip('/')}")
+                parameters = path_parameters(full_path, patterns)
                 
                 # Convert methods to list if it's a string
                 if isinstance(methods, str):
@@ -50,6 +42,7 @@ def extract_routes_from_json(json_data):
                         method_lower = method.lower()
                         routes[full_path][method_lower] = {
                             "summary": f"{method.upper()} {full_path}",
+                            **({"parameters": parameters} if parameters else {}),
                             "responses": {
                                 "200": {
                                     "description": "OK"
@@ -59,19 +52,39 @@ def extract_routes_from_json(json_data):
     
     return routes
 
+def path_parameters(template, patterns):
+    """Path parameters for a template, typed from the route's regex where it had one"""
+    parameters = extract_parameters_from_path(template)
+    for param in parameters:
+        regex = patterns.get(param["name"])
+        if regex in INTEGER_PATTERNS:
+            param["schema"] = {"type": "integer"}
+        elif regex:
+            param["schema"] = {"type": "string", "pattern": f"^{regex}$"}
+    return parameters
+
 def merge_paths(base_paths, new_paths):
     """Merge paths - ensure ALL endpoints from both files are kept"""
     merged = base_paths.copy()
     
+    # /wp/v2/posts/{id} and /wp/v2/posts/(?P<id>[\d]+) are the same path
+    index = TemplateIndex(merged)
+    
     # Add all paths from new_paths
     for path, methods in new_paths.items():
-        if path not in merged:
+        known = index.find(path)
+        if known is None:
             merged[path] = methods
+            index.add(path)
         else:
-            # Path exists, add any missing methods
+            # Path exists under other parameter names: rename ours to match, then add any missing methods
+            names = dict(zip(template_parameters(path), template_parameters(known)))
+            methods = rename_path_parameters(methods, {old: new for old, new in names.items() if old != new})
             for method, details in methods.items():
-                if method not in merged[path]:
-                    merged[path][method] = details
+                if isinstance(details, dict) and details.get("summary") == f"{method.upper()} {path}":
+                    details = dict(details, summary=f"{method.upper()} {known}")
+                if method not in merged[known]:
+                    merged[known][method] = details
     
     return merged
 
@@ -102,9 +115,8 @@ def merge_openapi(files, output_file="merged_openapi.yaml"):
     # Merge them
     merged_spec = merge_openapi_specs(wp_spec, json_data)
     
-    # Save result
-    with open(output_file, "w") as f:
-        yaml.dump(merged_spec, f, sort_keys=False, allow_unicode=True)
+    # Save result (JSON for the next stage, YAML to read)
+    save_spec(merged_spec, output_file)
 
     print(f" Merged OpenAPI spec saved to {output_file}")
 
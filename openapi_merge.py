@@ -0,0 +1,296 @@
+import argparse
+import time
+import tracemalloc
+from copy import deepcopy
+
+from path_normalizer import TemplateIndex, template_parameters
+
+# Path item keys that hold operations; anything else on a path item is filled in whole
+HTTP_METHODS = {"get", "put", "post", "delete", "options", "head", "patch", "trace"}
+
+
+def parameter_key(param):
+    """Parameters are unique per (name, in); references by their target."""
+    if "$ref" in param:
+        return ("$ref", param["$ref"])
+    return (param.get("name"), param.get("in"))
+
+
+def rename_path_parameters(item, names):
+    """A path item whose path parameters are renamed per `names`, copying only what changes."""
+    def rename(params):
+        if not any(param.get("in") == "path" and param.get("name") in names for param in params):
+            return params
+        return [dict(param, name=names[param["name"]])
+                if param.get("in") == "path" and param.get("name") in names else param
+                for param in params]
+
+    if not names:
+        return item
+
+    renamed = dict(item)
+    for key, value in item.items():
+        if key == "parameters" and isinstance(value, list):
+            renamed[key] = rename(value)
+        elif key in HTTP_METHODS and isinstance(value, dict) and value.get("parameters"):
+            params = rename(value["parameters"])
+            if params is not value["parameters"]:
+                renamed[key] = dict(value, parameters=params)
+    return renamed
+
+
+def with_default_example(param):
+    """The parameter with its schema default as example, when it has no example of its own."""
+    schema = param.get("schema") or {}
+    if "example" not in param and "default" in schema:
+        return dict(param, example=schema["default"])
+    return param
+
+
+class SpecMerger:
+    """Merges OpenAPI specs in priority order: earlier specs win, later ones only fill gaps.
+
+    Nothing is deep-copied. The result shares every subtree it takes unchanged
+    with the input it came from, and a container is copied (shallowly) only
+    the first time a later spec adds something to it. Parameters are indexed
+    by (name, in) once per operation, so each add() is linear in the size of
+    the incoming spec. Inputs are never modified, and callers should treat the
+    result as read-only too, or copy what they change.
+
+    With match_templates, paths are matched structurally (see
+    path_normalizer.TemplateIndex), so /posts/{id}, /posts/{post_id} and
+    /posts/(?P<id>[\\d]+) merge under whichever the earlier spec used, with the
+    later spec's path parameters renamed to match.
+    """
+
+    def __init__(self, match_templates=False):
+        self.spec = {}
+        self.templates = TemplateIndex() if match_templates else None
+        # ids of containers the merger created, and so may modify in place
+        self._owned = set()
+        self._parameters = {}
+
+    def _own(self, value):
+        if id(value) in self._owned:
+            return value
+        value = dict(value)
+        self._owned.add(id(value))
+        return value
+
+    def _fill(self, parent, key, source):
+        """Add source's missing keys to parent[key]; parent must already be owned."""
+        current = parent.get(key)
+        if current is None:
+            parent[key] = source
+            return
+        missing = [name for name in source if name not in current]
+        if missing:
+            current = parent[key] = self._own(current)
+            for name in missing:
+                current[name] = source[name]
+
+    def add(self, spec):
+        for key, value in spec.items():
+            if key not in self.spec:
+                self.spec[key] = None if key in ("paths", "components") else value
+
+        paths = spec.get("paths")
+        if paths:
+            if self.spec["paths"] is None:
+                self.spec["paths"] = paths
+                if self.templates is not None:
+                    for path in paths:
+                        self.templates.add(path)
+            else:
+                self.spec["paths"] = self._own(self.spec["paths"])
+                for path, item in paths.items():
+                    self._add_path(path, item)
+
+        components = spec.get("components")
+        if components:
+            if self.spec["components"] is None:
+                self.spec["components"] = components
+            else:
+                merged = self.spec["components"] = self._own(self.spec["components"])
+                for component_type, entries in components.items():
+                    self._fill(merged, component_type, entries)
+
+        return self
+
+    def _add_path(self, path, item):
+        paths = self.spec["paths"]
+        current = paths.get(path)
+        if current is None and self.templates is not None:
+            known = self.templates.find(path)
+            if known is None:
+                self.templates.add(path)
+            else:
+                names = dict(zip(template_parameters(path), template_parameters(known)))
+                item = rename_path_parameters(item, {old: new for old, new in names.items() if old != new})
+                path, current = known, paths[known]
+        if current is None:
+            paths[path] = item
+            return
+
+        for key, value in item.items():
+            existing = current.get(key)
+            if existing is None:
+                current = paths[path] = self._own(current)
+                current[key] = value
+            elif key in HTTP_METHODS and isinstance(existing, dict) and isinstance(value, dict):
+                merged = self._merge_operation((path, key), existing, value)
+                if merged is not existing:
+                    current = paths[path] = self._own(current)
+                    current[key] = merged
+
+    def _merge_operation(self, key, operation, other):
+        # Copied only once something is actually added
+        def owned():
+            nonlocal operation
+            operation = self._own(operation)
+            return operation
+
+        params = other.get("parameters")
+        if params:
+            index = self._parameters.get(key)
+            if index is None:
+                index = {parameter_key(param): param for param in operation.get("parameters") or []}
+            added = [with_default_example(param) for param in params if parameter_key(param) not in index]
+            if added:
+                op = owned()
+                if key not in self._parameters:
+                    op["parameters"] = list(op.get("parameters") or [])
+                    self._parameters[key] = index
+                for param in added:
+                    if parameter_key(param) not in index:
+                        index[parameter_key(param)] = param
+                        op["parameters"].append(param)
+
+        body = other.get("requestBody")
+        if body is not None:
+            current = operation.get("requestBody")
+            if current is None:
+                owned()["requestBody"] = body
+            elif body.get("content") and any(ctype not in current.get("content", {}) for ctype in body["content"]):
+                merged_body = owned()["requestBody"] = self._own(current)
+                self._fill(merged_body, "content", body["content"])
+
+        responses = other.get("responses")
+        if responses and any(code not in operation.get("responses", {}) for code in responses):
+            self._fill(owned(), "responses", responses)
+
+        return operation
+
+    def result(self):
+        return {key: value for key, value in self.spec.items() if value is not None}
+
+
+def merge_specs(specs, match_templates=False):
+    """Merge any number of OpenAPI specs in one pass; see SpecMerger."""
+    merger = SpecMerger(match_templates)
+    for spec in specs:
+        merger.add(spec)
+    return merger.result()
+
+
+def legacy_merge(base, other):
+    """super_merge_openapi's original deepcopy-based merge of two specs, kept as the benchmark baseline."""
+    merged_spec = deepcopy(base)
+    for path, wp_methods in other.get("paths", {}).items():
+        if path not in merged_spec["paths"]:
+            merged_spec["paths"][path] = deepcopy(wp_methods)
+            continue
+        for method, wp_details in wp_methods.items():
+            if method not in merged_spec["paths"][path]:
+                merged_spec["paths"][path][method] = deepcopy(wp_details)
+                continue
+            har_details = merged_spec["paths"][path][method]
+
+            har_params = har_details.get("parameters", [])
+            existing_keys = {(p["name"], p["in"]) for p in har_params}
+            for p in wp_details.get("parameters", []):
+                if (p["name"], p["in"]) not in existing_keys:
+                    har_params.append(deepcopy(p))
+            har_details["parameters"] = har_params
+
+            if "requestBody" not in har_details and "requestBody" in wp_details:
+                har_details["requestBody"] = deepcopy(wp_details["requestBody"])
+            elif "requestBody" in wp_details:
+                har_content = har_details["requestBody"].get("content", {})
+                for ctype, schema in wp_details["requestBody"].get("content", {}).items():
+                    if ctype not in har_content:
+                        har_content[ctype] = deepcopy(schema)
+                har_details["requestBody"]["content"] = har_content
+
+            har_responses = har_details.get("responses", {})
+            for code, resp in wp_details.get("responses", {}).items():
+                if code not in har_responses:
+                    har_responses[code] = deepcopy(resp)
+            har_details["responses"] = har_responses
+
+    for comp_type, comp_dict in other.get("components", {}).items():
+        merged_spec.setdefault("components", {}).setdefault(comp_type, {})
+        for name, value in comp_dict.items():
+            if name not in merged_spec["components"][comp_type]:
+                merged_spec["components"][comp_type][name] = deepcopy(value)
+    return merged_spec
+
+
+def synthetic_spec(operations, seed, overlap=0.5):
+    """A spec with the given number of operations; `overlap` of them share paths across seeds."""
+    methods = ["get", "post", "put", "delete"]
+    paths = {}
+    for i in range(operations):
+        shared = i < operations * overlap
+        path = f"/wp/v2/route{i // len(methods)}" + ("" if shared else f"/s{seed}") + "/{id}"
+        paths.setdefault(path, {})[methods[i % len(methods)]] = {
+            "summary": f"Operation {i} from spec {seed}",
+            "parameters": [
+                {"name": "id", "in": "path", "required": True, "schema": {"type": "integer"}},
+                {"name": f"filter{seed}", "in": "query", "schema": {"type": "string", "default": "all"}},
+            ],
+            "responses": {
+                str(200 + seed): {
+                    "description": "OK",
+                    "content": {"application/json": {"schema": {
+                        "type": "object",
+                        "properties": {f"field{j}": {"type": "string"} for j in range(10)},
+                    }}},
+                },
+            },
+        }
+    return {
+        "openapi": "3.0.3",
+        "info": {"title": f"Spec {seed}", "version": "1.0.0"},
+        "paths": paths,
+        "components": {"schemas": {f"Schema{seed}_{j}": {"type": "object"} for j in range(100)}},
+    }
+
+
+def benchmark(operations=10_000, spec_count=3):
+    specs = [synthetic_spec(operations, seed) for seed in range(spec_count)]
+
+    def legacy():
+        merged = specs[0]
+        for spec in specs[1:]:
+            merged = legacy_merge(merged, spec)
+        return merged
+
+    print(f" Merging {spec_count} synthetic specs of {operations} operations each")
+    for label, fn in (("deepcopy (legacy)", legacy), ("indexed (shared)", lambda: merge_specs(specs))):
+        tracemalloc.start()
+        start = time.perf_counter()
+        merged = fn()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        count = sum(len(item) for item in merged["paths"].values())
+        print(f"  {label:20} {elapsed:7.3f}s  peak {peak / 2 ** 20:8.1f} MiB  {count} operations")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the indexed OpenAPI merge against the deepcopy one")
+    parser.add_argument("--operations", type=int, default=10_000)
+    parser.add_argument("--specs", type=int, default=3)
+    args = parser.parse_args()
+    benchmark(args.operations, args.specs)
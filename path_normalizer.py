@@ -0,0 +1,327 @@
+import argparse
+import json
+import os
+import random
+import re
+import time
+
+# Default route list produced by StaticRouteExtractor.php
+DEFAULT_ROUTES_FILE = "output/static_routes_full.json"
+
+# Heuristics for segments that no known route explains
+UUID_SEGMENT = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.I)
+HASH_SEGMENT = re.compile(r"[0-9a-f]{32}|[0-9a-f]{40}|[0-9a-f]{64}", re.I)
+
+# Route template segments: {name} or a WordPress regex group (?P<name>...) / (?<name>...)
+TEMPLATE_SEGMENT = re.compile(r"^\{(\w+)\}")
+REGEX_SEGMENT = re.compile(r"^\(\?P?<(\w+)>(.*)\)$")
+
+# The original two-pass normalizer, kept as the benchmark baseline
+LEGACY_ID_PATTERN = re.compile(r"/\d+")
+LEGACY_UUID_PATTERN = re.compile(
+    r"/[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.I
+)
+
+
+def regex_normalize_path(path):
+    """Replace IDs and UUIDs in the path with placeholders (legacy regex version)."""
+    path = LEGACY_ID_PATTERN.sub("/{id}", path)
+    path = LEGACY_UUID_PATTERN.sub("/{uuid}", path)
+    return path
+
+
+def guess_segment(segment):
+    """Placeholder for a segment no known route covers, or the segment itself."""
+    if segment.isdigit():
+        return "{id}"
+    if len(segment) == 36 and UUID_SEGMENT.fullmatch(segment):
+        return "{uuid}"
+    if len(segment) in (32, 40, 64) and HASH_SEGMENT.fullmatch(segment) and not segment.isalpha():
+        return "{hash}"
+    return segment
+
+
+class RouteNode:
+    # params: (name, compiled regex or None, child, whether the regex can span "/")
+    __slots__ = ("literals", "params", "terminal")
+
+    def __init__(self):
+        self.literals = {}
+        self.params = []
+        self.terminal = False
+
+
+class RouteTrie:
+    """Trie of known route templates, one level per path segment."""
+
+    def __init__(self):
+        self.root = RouteNode()
+
+    def add(self, template):
+        node = self.root
+        # split_route keeps a regex group containing "/" in one segment
+        for segment in split_route(template):
+            param = self._parse_param(segment)
+            if param is None:
+                node = node.literals.setdefault(segment, RouteNode())
+                continue
+
+            name, pattern = param
+            for existing_name, existing_pattern, child, _ in node.params:
+                if existing_name == name and existing_pattern == pattern:
+                    node = child
+                    break
+            else:
+                child = RouteNode()
+                node.params.append((name, pattern, child, pattern is not None and "/" in pattern.pattern))
+                node = child
+        node.terminal = True
+
+    @staticmethod
+    def _parse_param(segment):
+        match = TEMPLATE_SEGMENT.match(segment)
+        if match:
+            return match.group(1), None
+
+        match = REGEX_SEGMENT.match(segment)
+        if match:
+            try:
+                return match.group(1), re.compile(match.group(2))
+            except re.error:
+                return match.group(1), None
+
+        return None
+
+    @staticmethod
+    def _param_choices(params, segments, index):
+        """(name, child, next index) for each parameter matching at index.
+
+        A parameter whose regex can contain "/" (e.g. a block template id like
+        theme//slug) may take several segments; those are tried after the
+        single-segment parameters, shortest first, so deeper literal routes
+        (.../(?P<parent>...)/revisions) still win.
+        """
+        for name, pattern, child, spans in params:
+            if not spans and (pattern is None or pattern.fullmatch(segments[index])):
+                yield name, child, index + 1
+        for name, pattern, child, spans in params:
+            if spans:
+                for end in range(index + 1, len(segments) + 1):
+                    if pattern.fullmatch("/".join(segments[index:end])):
+                        yield name, child, end
+
+    def match(self, segments):
+        """Return the template segments for a full match, or None.
+
+        Depth-first with literal segments tried before parameters, written as a
+        loop with explicit choice points since this runs once per HAR entry.
+        """
+        count = len(segments)
+        out = []
+        pending = []
+        node, index = self.root, 0
+
+        while True:
+            if index < count:
+                segment = segments[index]
+                if node.params:
+                    # out may be shorter than index once a parameter has spanned segments
+                    pending.append((index, len(out), self._param_choices(node.params, segments, index)))
+                child = node.literals.get(segment)
+                if child is not None:
+                    out.append(segment)
+                    node, index = child, index + 1
+                    continue
+            elif node.terminal:
+                return out
+
+            # Dead end: resume the latest choice point with its next matching parameter
+            while pending:
+                index, depth, choices = pending[-1]
+                choice = next(choices, None)
+                if choice is None:
+                    pending.pop()
+                    continue
+                name, child, end = choice
+                del out[depth:]
+                out.append("{" + name + "}")
+                node, index = child, end
+                break
+            else:
+                return None
+
+
+class PathNormalizer:
+    """Single-pass path normalizer: known routes first, ID/UUID/hash heuristics otherwise."""
+
+    def __init__(self, templates=()):
+        self.trie = RouteTrie()
+        for template in templates:
+            self.trie.add(template)
+
+    @classmethod
+    def from_routes_file(cls, routes_file):
+        """Build a normalizer from static_routes_full.json, or a heuristic-only one if it's absent."""
+        if not routes_file or not os.path.exists(routes_file):
+            return cls()
+        return cls(load_route_templates(routes_file))
+
+    def normalize(self, path):
+        inner = path.strip("/").split("/")
+        if "" in inner:
+            inner = [segment for segment in inner if segment]
+
+        matched = self.trie.match(inner) if inner else None
+        if matched is None:
+            matched = [guess_segment(segment) for segment in inner]
+
+        normalized = "/" + "/".join(matched) if path.startswith("/") else "/".join(matched)
+        if path.endswith("/") and inner:
+            normalized += "/"
+        return normalized
+
+
+def split_route(route):
+    """Path segments of a route; a regex group containing "/" stays in one segment."""
+    segments, current, depth, in_class, escaped = [], [], 0, False, False
+    for char in route:
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "/" and depth == 0:
+            if current:
+                segments.append("".join(current))
+            current = []
+            continue
+        current.append(char)
+    if current:
+        segments.append("".join(current))
+    return segments
+
+
+def route_to_template(route):
+    """OpenAPI template for a WordPress route, e.g. /posts/(?P<id>[\\d]+) -> /posts/{id}.
+
+    Returns the template and {name: regex} for the parameters that had one.
+    """
+    patterns = {}
+    segments = []
+    for segment in split_route(route):
+        match = REGEX_SEGMENT.match(segment)
+        if match:
+            name, patterns[match.group(1)] = match.group(1), match.group(2)
+            segment = "{" + name + "}"
+        segments.append(segment)
+    return "/" + "/".join(segments), patterns
+
+
+def template_parameters(template):
+    """Parameter names of a template or route, in path order."""
+    names = []
+    for segment in split_route(template):
+        match = TEMPLATE_SEGMENT.match(segment) or REGEX_SEGMENT.match(segment)
+        if match:
+            names.append(match.group(1))
+    return names
+
+
+def template_key(template):
+    """Structural identity of a template: its segments with parameter names (and syntax) erased."""
+    return tuple(
+        "{}" if TEMPLATE_SEGMENT.match(segment) or REGEX_SEGMENT.match(segment) else segment
+        for segment in split_route(template)
+    )
+
+
+class TemplateIndex:
+    """Finds which known path a template or WordPress route refers to.
+
+    `/wp/v2/posts/{id}`, `/wp/v2/posts/{post_id}` and `/wp/v2/posts/(?P<id>[\\d]+)`
+    all share the key ("wp", "v2", "posts", "{}"), so lookups are one dict probe.
+    Known routes with regex parameters also go into a RouteTrie, so a concrete
+    segment (e.g. an ID the normalizer left as is) can still match them.
+    """
+
+    def __init__(self, paths=()):
+        self.paths = {}
+        self.trie = RouteTrie()
+        for path in paths:
+            self.add(path)
+
+    def add(self, path):
+        key = template_key(path)
+        self.paths.setdefault(key, path)
+        if "(" in path:
+            self.trie.add(path)
+
+    def find(self, path):
+        known = self.paths.get(template_key(path))
+        if known is not None or not self.trie.root.literals:
+            return known
+        matched = self.trie.match(split_route(path))
+        return self.paths.get(template_key("/".join(matched))) if matched else None
+
+
+def load_route_templates(routes_file):
+    """Full route templates (namespace + route) from a static extractor route list."""
+    with open(routes_file, "r", encoding="utf-8") as f:
+        routes = json.load(f)
+
+    templates = []
+    for item in routes if isinstance(routes, list) else []:
+        if not isinstance(item, dict) or not item.get("route"):
+            continue
+        namespace = (item.get("namespace") or "").strip("/")
+        route = item["route"].strip("/")
+        templates.append(f"/{namespace}/{route}" if namespace else f"/{route}")
+    return templates
+
+
+def synthetic_paths(templates, count, seed=0):
+    """Concrete request paths for benchmarking, mixing known routes and core-style URLs."""
+    rng = random.Random(seed)
+    core = ["/wp/v2/posts/{id}", "/wp/v2/media/{id}", "/wp/v2/users/{id}", "/wp/v2/pages/{id}/revisions/{id}",
+            "/wp/v2/posts", "/oembed/1.0/embed", "/wp/v2/2fa/{uuid}", "/wc/v3/orders/{id}/notes"]
+    pool = list(templates) + core
+
+    def fill(match):
+        name = match.group(1) or match.group(2)
+        if name == "uuid":
+            return "%08x-%04x-%04x-%04x-%012x" % tuple(rng.getrandbits(bits) for bits in (32, 16, 16, 16, 48))
+        if name.endswith("id") or name == "id":
+            return str(rng.randint(1, 10 ** 6))
+        return rng.choice(["general", "widgets", "akismet", "monthly"])
+
+    placeholder = re.compile(r"\{(\w+)\}[^/]*|\(\?P?<(\w+)>[^/]*")
+    return [placeholder.sub(fill, rng.choice(pool)) for _ in range(count)]
+
+
+def benchmark(routes_file=DEFAULT_ROUTES_FILE, count=1_000_000):
+    templates = load_route_templates(routes_file) if os.path.exists(routes_file) else []
+    paths = synthetic_paths(templates, count)
+    normalizer = PathNormalizer(templates)
+
+    print(f" Benchmarking {count} synthetic paths against {len(templates)} known routes")
+    for label, fn in (("regex (two-pass)", regex_normalize_path), ("trie (single-pass)", normalizer.normalize)):
+        start = time.perf_counter()
+        for path in paths:
+            fn(path)
+        elapsed = time.perf_counter() - start
+        print(f"  {label:20} {elapsed:7.2f}s  {count / elapsed:12,.0f} paths/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the route-trie path normalizer against the regex one")
+    parser.add_argument("--routes", default=DEFAULT_ROUTES_FILE)
+    parser.add_argument("--count", type=int, default=1_000_000)
+    args = parser.parse_args()
+    benchmark(args.routes, args.count)
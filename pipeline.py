@@ -0,0 +1,163 @@
+import argparse
+import os
+import subprocess
+import time
+
+from extract_full_rest_from_har import DEFAULT_HAR_FILE, extract_openapi_spec
+from merge_openapi import merge_openapi_specs
+from path_normalizer import DEFAULT_ROUTES_FILE
+from spec_io import json_sibling, load_spec, save_spec
+from step_cache import StepCache
+from super_merge_openapi import super_merge
+
+# Stage inputs and outputs, relative to the project root
+WP_OPENAPI_FILE = "output/wp-openapi.yaml"
+MERGED_FILE = "output/merged_openapi.yaml"
+HAR_FILE = DEFAULT_HAR_FILE
+HAR_SPEC_FILE = "captures/wp_rest_openapi.yaml"
+SMART_FILE = "captures/merged_spec_smart.yaml"
+
+STEPS = ("static", "extract_har", "merge_openapi", "super_merge")
+
+# WordPress tree StaticRouteExtractor.php scans (keep in sync with its $wpBase)
+WP_SOURCE_ROOT = os.environ.get("WP_PATH", "/var/www/html")
+
+# Where the stage scripts live (the project root may be elsewhere, see --root)
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def code(*names):
+    return [os.path.join(CODE_DIR, name) for name in names]
+
+
+# What each step reads and writes, for skipping steps whose inputs are unchanged.
+# The step's own code counts as an input, so editing it re-runs the step.
+STEP_FILES = {
+    "static": {
+        "inputs": code("StaticRouteExtractor.php") + [(os.path.join(CODE_DIR, "src"), [".php"])] + [
+            (os.path.join(WP_SOURCE_ROOT, tree), [".php"])
+            for tree in ("wp-content/plugins", "wp-content/themes", "wp-includes", "wp-admin")
+        ],
+        "outputs": [DEFAULT_ROUTES_FILE],
+    },
+    "extract_har": {
+        "inputs": [HAR_FILE, DEFAULT_ROUTES_FILE] + code("extract_full_rest_from_har.py", "path_normalizer.py",
+                                                         "schema_inference.py", "spec_io.py"),
+        "outputs": [json_sibling(HAR_SPEC_FILE)],
+    },
+    "merge_openapi": {
+        "inputs": [WP_OPENAPI_FILE, DEFAULT_ROUTES_FILE] + code("merge_openapi.py", "openapi_merge.py",
+                                                                "path_normalizer.py", "spec_io.py"),
+        "outputs": [json_sibling(MERGED_FILE)],
+    },
+    "super_merge": {
+        "inputs": [json_sibling(MERGED_FILE), json_sibling(HAR_SPEC_FILE)] + code("super_merge_openapi.py",
+                                                                                 "openapi_merge.py", "spec_io.py"),
+        "outputs": [json_sibling(SMART_FILE), SMART_FILE],
+    },
+}
+
+
+class Pipeline:
+    """Runs static -> extract -> merge -> super-merge in one process.
+
+    The static step shells out to StaticRouteExtractor.php; the others are
+    Python and run in this process.
+
+    Each stage still writes its output as JSON (plus YAML for the final spec;
+    the intermediates' YAML is rendered when the dashboard serves it), but
+    hands the spec object it built straight to the next stage. A spec is
+    only read back from disk when this process didn't produce it, or the file
+    changed since (e.g. a stage was run from the command line in between).
+
+    Steps whose inputs (by content hash) and outputs match the manifest from
+    their last successful run are skipped, unless forced.
+    """
+
+    def __init__(self, root=".", stream=False, workers=1, cache_file=None):
+        self.root = root
+        self.extract_options = {"stream": stream, "workers": workers, "cache_file": cache_file}
+        # file -> (spec, mtime of the JSON we wrote)
+        self.specs = {}
+        self.cache = StepCache(root)
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def load(self, name):
+        path = self.path(name)
+        cached = self.specs.get(path)
+        json_path = json_sibling(path)
+        if cached and os.path.exists(json_path) and os.path.getmtime(json_path) == cached[1]:
+            return cached[0]
+        return load_spec(path)
+
+    def save(self, name, spec, yaml_copy=True):
+        path = self.path(name)
+        json_path = save_spec(spec, path, yaml_copy=yaml_copy)
+        self.specs[path] = (spec, os.path.getmtime(json_path))
+        print(f" Saved {json_path}" + (f" and {path}" if yaml_copy and path != json_path else ""))
+        return spec
+
+    def static(self):
+        output = self.path(DEFAULT_ROUTES_FILE)
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        # The extractor loads vendor/autoload.php relative to the working directory
+        command = ["php", "StaticRouteExtractor.php", os.path.abspath(output)]
+        process = subprocess.Popen(command, cwd=CODE_DIR, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                   text=True, bufsize=1)
+        for line in process.stdout:
+            print(line, end="")
+        if process.wait() != 0:
+            raise subprocess.CalledProcessError(process.returncode, command)
+
+    def extract_har(self):
+        spec = extract_openapi_spec(self.path(HAR_FILE), routes_file=self.path(DEFAULT_ROUTES_FILE),
+                                    **self.extract_options)
+        print(f" Extracted {len(spec['paths'])} endpoints from {HAR_FILE}")
+        return self.save(HAR_SPEC_FILE, spec, yaml_copy=False)
+
+    def merge_openapi(self):
+        spec = merge_openapi_specs(load_spec(self.path(WP_OPENAPI_FILE)), load_spec(self.path(DEFAULT_ROUTES_FILE)))
+        print(f" Merged {len(spec['paths'])} paths from {WP_OPENAPI_FILE} and {DEFAULT_ROUTES_FILE}")
+        return self.save(MERGED_FILE, spec, yaml_copy=False)
+
+    def super_merge(self):
+        spec = super_merge(self.load(MERGED_FILE), self.load(HAR_SPEC_FILE))
+        print(f" Smart merged {len(spec['paths'])} paths")
+        return self.save(SMART_FILE, spec)
+
+    def is_fresh(self, step):
+        files = STEP_FILES[step]
+        return self.cache.is_fresh(step, files["inputs"], files["outputs"])
+
+    def record(self, step):
+        files = STEP_FILES[step]
+        self.cache.record(step, files["inputs"], files["outputs"])
+
+    def run(self, steps=STEPS, force=False):
+        unknown = [step for step in steps if step not in STEPS]
+        if unknown:
+            raise ValueError(f"Unknown step: {', '.join(unknown)}")
+
+        for step in steps:
+            start = time.perf_counter()
+            print(f"==> {step}")
+            if not force and self.is_fresh(step):
+                print(f"    inputs unchanged, keeping {', '.join(STEP_FILES[step]['outputs'])}")
+                continue
+            getattr(self, step)()
+            self.record(step)
+            print(f"    {step} took {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run static -> extract -> merge -> super-merge in one process")
+    parser.add_argument("steps", nargs="*", default=list(STEPS), help=f"steps to run, of {', '.join(STEPS)} (default: all)")
+    parser.add_argument("--root", default=".", help="project root the stage files are relative to")
+    parser.add_argument("--stream", action="store_true", help="parse the HAR incrementally")
+    parser.add_argument("--workers", type=int, default=1, help="processes to extract the HAR with")
+    parser.add_argument("--cache", metavar="CACHE_FILE", help="fragment cache for HAR extraction")
+    parser.add_argument("--force", action="store_true", help="run steps even when their inputs are unchanged")
+    args = parser.parse_args()
+    Pipeline(args.root, stream=args.stream, workers=args.workers, cache_file=args.cache).run(args.steps, args.force)
@@ -1,17 +1,48 @@
+import argparse
 import asyncio
 import base64
+import hashlib
 import json
+import math
 import os
-from urllib.parse import urljoin, urlencode
+import re
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import islice
+from urllib.parse import urljoin, urlencode, urlparse, parse_qsl
 from playwright.async_api import async_playwright
-import yaml
+import requests
+from requests.adapters import HTTPAdapter
+from extract_full_rest_from_har import iter_har_entries, iter_har_entries_streaming
+from path_normalizer import PathNormalizer, template_key
+from spec_io import load_spec
 
 # ==== CONFIG ====
 BASE_URL = os.environ.get("WP_BASE", "http://localhost")
 BASIC_USER = os.environ.get("WP_USER", "Admin")
 BASIC_PASS = os.environ.get("WP_PASS", "Hannah1998#")
 HAR_PATH = os.environ.get("HAR_PATH", "captures/wp.har")
-OPENAPI_PATH = "/home/user/api-spec-generator/wp_openapi.yaml"
+OPENAPI_PATH = os.environ.get("WP_OPENAPI_PATH", "/home/user/api-spec-generator/wp_openapi.yaml")
+CONCURRENCY = int(os.environ.get("WP_CONCURRENCY", "1"))
+CONTEXTS = int(os.environ.get("WP_CONTEXTS", "1"))
+NONCE_TTL = float(os.environ.get("WP_NONCE_TTL", "3600"))
+ENGINE = os.environ.get("WP_ENGINE", "browser")
+SEGMENT_SIZE = int(os.environ.get("WP_SEGMENT_SIZE", "100"))
+HAR_SCOPE = os.environ.get("WP_HAR_SCOPE", "rest")
+HAR_CONTENT = os.environ.get("WP_HAR_CONTENT", "embed")
+
+# ==== HAR CONTENT ====
+# What extract_full_rest_from_har reads; page loads, assets and the login form are left out of the HAR
+REST_URL_PATTERN = re.compile(r"/wp-json(/|$)|[?&]rest_route=")
+# In attach mode, non-JSON bodies above this stay in files next to the HAR instead of inline
+ATTACH_MIN_BYTES = 64 * 1024
+
+# ==== RATE LIMITING ====
+BACKOFF_STATUSES = {429, 503}
+MAX_REQUEST_DELAY = 10.0
 
 # ==== PATH PARAMETER DEFAULTS PER ENDPOINT ====
 param_defaults = {
@@ -57,100 +88,258 @@ endpoint_fixes = {
 }
 
 # ==== DYNAMIC FETCH ENDPOINTS FROM OPENAPI ====
-fetch_endpoints = []
-with open(OPENAPI_PATH, "r") as f:
-    spec = yaml.safe_load(f)
-    for path, methods in spec.get("paths", {}).items():
-        actual_path = path
-        if path in param_defaults:
-            if isinstance(param_defaults[path], dict):
-                for param_name, value in param_defaults[path].items():
-                    actual_path = actual_path.replace(f"{{{param_name}}}", str(value))
-            else:
-                param_name = list(methods.values())[0].get('parameters', [{}])[0].get('name', 'id')
-                if f"{{{param_name}}}" in actual_path:
-                    actual_path = actual_path.replace(f"{{{param_name}}}", str(param_defaults[path]))
+# Planned lazily (spec -> operations -> concrete requests) and consumed by the
+# dispatcher as it goes, so nothing is built at import and the first request
+# goes out without waiting for the rest of the plan.
+def load_openapi_spec(openapi_path=OPENAPI_PATH):
+    if not os.path.exists(openapi_path):
+        raise FileNotFoundError(f"OpenAPI spec not found: {openapi_path} (set WP_OPENAPI_PATH or --openapi)")
+    return load_spec(openapi_path)
+
+def in_namespaces(path, namespaces):
+    """Whether a route belongs to one of the namespaces (e.g. "wp/v2", or just "wp" for all its versions)."""
+    if not namespaces:
+        return True
+    return any(path == f"/{namespace}" or path.startswith(f"/{namespace}/")
+               for namespace in (namespace.strip("/") for namespace in namespaces))
+
+def iter_operations(spec, namespaces=None, methods=None):
+    """Yield (path, path item, method, operation) for the operations passing the filters."""
+    methods = {method.lower() for method in methods} if methods else None
+    for path, path_item in spec.get("paths", {}).items():
+        if not in_namespaces(path, namespaces):
+            continue
+        for method, details in path_item.items():
+            if methods is None or method.lower() in methods:
+                yield path, path_item, method, details
+
+def concrete_path(path, methods):
+    """The request path for a route: path parameters filled in and default query parameters added."""
+    actual_path = path
+    if path in param_defaults:
+        if isinstance(param_defaults[path], dict):
+            for param_name, value in param_defaults[path].items():
+                actual_path = actual_path.replace(f"{{{param_name}}}", str(value))
         else:
-            for param_name in ['id', 'slug', 'field_id', 'user_id', 'job_id', 'module_id']:
-                if f"{{{param_name}}}" in actual_path:
-                    actual_path = actual_path.replace(f"{{{param_name}}}", "1")
-
-        # Handle query parameters for all endpoints
-        query_params = []
-        for method_name, method_details in methods.items():
-            if 'parameters' in method_details:
-                for param in method_details['parameters']:
-                    if param.get('in') == 'query' and 'default' in param.get('schema', {}):
-                        query_params.append(f"{param['name']}={param['schema']['default']}")
-
-        # Add specific query params from param_defaults
-        if path == "/forminator/v1/preview/polls" and path in param_defaults:
-            for k, v in param_defaults[path].items():
-                query_params.append(f"{k}={v}")
-
-        full_path = f"/wp-json{actual_path}"
-        if query_params:
-            full_path += "?" + "&".join(query_params)
-
-        for method, details in methods.items():
-            method_upper = method.upper()
-            body = None
-            content_type = "application/x-www-form-urlencoded"
-            requires_browser_context = False
-
-            # Apply endpoint-specific fixes
-            if path in endpoint_fixes:
-                fix = endpoint_fixes[path]
-                if "body" in fix:
-                    body = fix["body"]
-                if "content_type" in fix:
-                    content_type = fix["content_type"]
-                if "requires_browser_context" in fix:
-                    requires_browser_context = fix["requires_browser_context"]
-
-            elif "requestBody" in details:
-                content = details["requestBody"].get("content", {})
-
-                if "application/json" in content:
-                    content_type = "application/json"
-                    props = content["application/json"]["schema"].get("properties", {})
-                    body = {}
-                    for k in props.keys():
-                        if any(word in k.lower() for word in ['email', 'mail']):
-                            body[k] = "test@example.com"
-                        elif any(word in k.lower() for word in ['name', 'title', 'subject']):
-                            body[k] = "Test Data"
-                        elif props[k].get('type') == 'boolean':
-                            body[k] = True
-                        elif props[k].get('type') == 'integer':
-                            body[k] = 1
-                        else:
-                            body[k] = "test"
-
-                elif "application/x-www-form-urlencoded" in content:
-                    props = content["application/x-www-form-urlencoded"]["schema"].get("properties", {})
-                    body = {}
-                    for k in props.keys():
-                        if any(word in k.lower() for word in ['email', 'mail']):
-                            body[k] = "test@example.com"
-                        elif any(word in k.lower() for word in ['name', 'title', 'subject']):
-                            body[k] = "Test Data"
-                        elif any(word in k.lower() for word in ['content', 'description', 'message']):
-                            body[k] = "This is a test content for HAR capture"
-                        elif any(word in k.lower() for word in ['price', 'amount', 'cost']):
-                            body[k] = "10.00"
-                        elif any(word in k.lower() for word in ['url', 'link']):
-                            body[k] = "https://example.com"
-                        elif any(word in k.lower() for word in ['phone', 'tel']):
-                            body[k] = "+1234567890"
-                        elif props[k].get('type') == 'boolean':
-                            body[k] = "true"
-                        elif props[k].get('type') == 'integer':
-                            body[k] = "1"
-                        else:
-                            body[k] = "test"
+            param_name = list(methods.values())[0].get('parameters', [{}])[0].get('name', 'id')
+            if f"{{{param_name}}}" in actual_path:
+                actual_path = actual_path.replace(f"{{{param_name}}}", str(param_defaults[path]))
+    else:
+        for param_name in ['id', 'slug', 'field_id', 'user_id', 'job_id', 'module_id']:
+            if f"{{{param_name}}}" in actual_path:
+                actual_path = actual_path.replace(f"{{{param_name}}}", "1")
+
+    # Handle query parameters for all endpoints
+    query_params = []
+    for method_name, method_details in methods.items():
+        if 'parameters' in method_details:
+            for param in method_details['parameters']:
+                if param.get('in') == 'query' and 'default' in param.get('schema', {}):
+                    query_params.append(f"{param['name']}={param['schema']['default']}")
+
+    # Add specific query params from param_defaults
+    if path == "/forminator/v1/preview/polls" and path in param_defaults:
+        for k, v in param_defaults[path].items():
+            query_params.append(f"{k}={v}")
+
+    full_path = f"/wp-json{actual_path}"
+    if query_params:
+        full_path += "?" + "&".join(query_params)
+    return full_path
+
+def json_body(props):
+    body = {}
+    for k in props.keys():
+        if any(word in k.lower() for word in ['email', 'mail']):
+            body[k] = "test@example.com"
+        elif any(word in k.lower() for word in ['name', 'title', 'subject']):
+            body[k] = "Test Data"
+        elif props[k].get('type') == 'boolean':
+            body[k] = True
+        elif props[k].get('type') == 'integer':
+            body[k] = 1
+        else:
+            body[k] = "test"
+    return body
+
+def form_body(props):
+    body = {}
+    for k in props.keys():
+        if any(word in k.lower() for word in ['email', 'mail']):
+            body[k] = "test@example.com"
+        elif any(word in k.lower() for word in ['name', 'title', 'subject']):
+            body[k] = "Test Data"
+        elif any(word in k.lower() for word in ['content', 'description', 'message']):
+            body[k] = "This is a test content for HAR capture"
+        elif any(word in k.lower() for word in ['price', 'amount', 'cost']):
+            body[k] = "10.00"
+        elif any(word in k.lower() for word in ['url', 'link']):
+            body[k] = "https://example.com"
+        elif any(word in k.lower() for word in ['phone', 'tel']):
+            body[k] = "+1234567890"
+        elif props[k].get('type') == 'boolean':
+            body[k] = "true"
+        elif props[k].get('type') == 'integer':
+            body[k] = "1"
+        else:
+            body[k] = "test"
+    return body
+
+def request_for(path, method, details, full_path):
+    """The (method, path, body, content type, requires browser context, route) tuple the dispatcher sends."""
+    body = None
+    content_type = "application/x-www-form-urlencoded"
+    requires_browser_context = False
+
+    # Apply endpoint-specific fixes
+    if path in endpoint_fixes:
+        fix = endpoint_fixes[path]
+        if "body" in fix:
+            body = fix["body"]
+        if "content_type" in fix:
+            content_type = fix["content_type"]
+        if "requires_browser_context" in fix:
+            requires_browser_context = fix["requires_browser_context"]
+
+    elif "requestBody" in details:
+        content = details["requestBody"].get("content", {})
+
+        if "application/json" in content:
+            content_type = "application/json"
+            body = json_body(content["application/json"]["schema"].get("properties", {}))
+
+        elif "application/x-www-form-urlencoded" in content:
+            body = form_body(content["application/x-www-form-urlencoded"]["schema"].get("properties", {}))
+
+    return (method.upper(), full_path, body, content_type, requires_browser_context, path)
+
+def plan_fetch_endpoints(spec, namespaces=None, methods=None, coverage=None):
+    """Lazily yield the requests to send for a spec, filtered by namespace and method.
 
-            fetch_endpoints.append((method_upper, full_path, body, content_type, requires_browser_context))
+    With a CoverageScheduler, operations come in its order and stop when its target is met.
+    """
+    operations = iter_operations(spec, namespaces, methods)
+    if coverage is not None:
+        operations = coverage.prioritize(operations)
+    full_paths = {}
+    for path, path_item, method, details in operations:
+        if path not in full_paths:
+            full_paths[path] = concrete_path(path, path_item)
+        request = request_for(path, method, details, full_paths[path])
+        if coverage is not None:
+            coverage.track(path, method, request)
+        yield request
+
+def load_plan_inputs(openapi_path, coverage_from=None, coverage_target=1.0):
+    spec = load_openapi_spec(openapi_path)
+    coverage = CoverageScheduler.load(coverage_from, spec, coverage_target) if coverage_from else None
+    return spec, coverage
+
+# ==== COVERAGE-GUIDED SCHEDULING ====
+def query_names(url):
+    return frozenset(name for name, _ in parse_qsl(urlparse(url).query, keep_blank_values=True))
+
+def operation_key(path, method):
+    """Operations are identified by method and route structure, whatever the parameters are named."""
+    # Some spec paths carry their query string (e.g. polls?module_id={id})
+    return (method.upper(), template_key(path.split("?", 1)[0]))
+
+class CoverageScheduler:
+    """Orders operations by what an earlier capture (a HAR, or the spec extracted from one) lacks.
+
+    Operations with no 2xx sample go first, then those whose planned query
+    parameters never appeared together in a 2xx sample. Operations already
+    covered are not sent again. Coverage is the share of planned operations
+    that have a matching 2xx sample; planning stops once it reaches the target
+    (checked as requests come back, so at segment granularity).
+    """
+
+    def __init__(self, observed, target=1.0):
+        # operation key -> query parameter name sets seen in 2xx samples
+        self.observed = observed
+        self.target = target
+        self.operations = set()
+        self.covered = set()
+        self.planned = {}
+
+    @classmethod
+    def load(cls, path, spec, target=1.0):
+        if path.endswith(".har"):
+            return cls.from_har(path, spec, target)
+        return cls.from_spec(load_spec(path), target)
+
+    @classmethod
+    def from_har(cls, har_path, spec, target=1.0):
+        # Concrete URLs are mapped back onto the spec's templates
+        normalizer = PathNormalizer(spec.get("paths", {}))
+        observed = {}
+        for entry in iter_har_entries(har_path, stream=True):
+            request = entry.get("request", {})
+            url = request.get("url", "")
+            if not 200 <= entry.get("response", {}).get("status", 0) < 300 or "/wp-json" not in url:
+                continue
+            path = urlparse(url).path.split("/wp-json", 1)[-1] or "/"
+            key = operation_key(normalizer.normalize(path), request.get("method", "GET"))
+            observed.setdefault(key, set()).add(query_names(url))
+        return cls(observed, target)
+
+    @classmethod
+    def from_spec(cls, spec, target=1.0):
+        observed = {}
+        for path, path_item in spec.get("paths", {}).items():
+            for method, operation in path_item.items():
+                if not isinstance(operation, dict) or not any(
+                        str(code).startswith("2") for code in operation.get("responses", {})):
+                    continue
+                names = frozenset(param.get("name") for param in operation.get("parameters", [])
+                                  if param.get("in") == "query")
+                observed.setdefault(operation_key(path, method), set()).add(names)
+        return cls(observed, target)
+
+    def gap(self, key, names):
+        """0 without any 2xx sample, 1 without one for these query parameters, None when covered."""
+        seen = self.observed.get(key)
+        if not seen:
+            return 0
+        if any(names <= variant for variant in seen):
+            return None
+        return 1
+
+    def met(self):
+        return bool(self.operations) and len(self.covered) >= self.target * len(self.operations)
+
+    def prioritize(self, operations):
+        gaps = ([], [])
+        for operation in operations:
+            path, path_item, method, _ = operation
+            key = operation_key(path, method)
+            self.operations.add(key)
+            gap = self.gap(key, query_names(concrete_path(path, path_item)))
+            if gap is None:
+                self.covered.add(key)
+            else:
+                gaps[gap].append(operation)
+
+        print(f" Coverage: {self.summary()}; {len(gaps[0])} operation(s) without a 2xx sample, "
+              f"{len(gaps[1])} missing a parameter variant")
+        for operation in gaps[0] + gaps[1]:
+            if self.met():
+                print(f" Coverage target of {self.target:.0%} reached")
+                return
+            yield operation
+
+    def track(self, path, method, request):
+        self.planned[endpoint_key(request)] = operation_key(path, method)
+
+    def record(self, results):
+        for endpoint, result in results:
+            key = self.planned.get(endpoint_key(endpoint))
+            if key is not None and 200 <= result["status"] < 300:
+                self.covered.add(key)
+
+    def summary(self):
+        share = len(self.covered) / len(self.operations) if self.operations else 1.0
+        return f"{len(self.covered)}/{len(self.operations)} operations covered ({share:.0%})"
 
 # ==== BROWSER INTERACTION ENDPOINTS ====
 browser_endpoints = [
@@ -163,67 +352,531 @@ def auth_header(user, pwd):
     token = base64.b64encode(f"{user}:{pwd}".encode()).decode()
     return f"Basic {token}"
 
-# ==== HELPER: FETCH USING BROWSER CONTEXT ====
-async def fetch_with_browser_context(page, url, method, body, content_type, auth):
-    try:
-        # Make sure we're on a page that has the frontend session
-        current_url = page.url
-        if not current_url.startswith(BASE_URL) or "wp-admin" in current_url:
-            await page.goto(BASE_URL, wait_until="networkidle")
+# ==== NONCE CACHE ====
+class NonceCache:
+    """Caches the REST nonce for the logged-in session so it is read once, not per request."""
+
+    def __init__(self, ttl=NONCE_TTL):
+        self.ttl = ttl
+        self.nonce = None
+        self.fetched_at = None
+        # Created on first use: before Python 3.10 a Lock binds to the loop current at
+        # construction, and the module-level cache is built before asyncio.run starts one
+        self._lock = None
+
+    def expired(self):
+        return self.fetched_at is None or time.monotonic() - self.fetched_at > self.ttl
+
+    def invalidate(self, stale_nonce):
+        # Concurrent requests rejected with the same nonce only trigger one refresh
+        if self.nonce == stale_nonce:
+            self.fetched_at = None
 
-        # Try to get WordPress nonce from the page
+    async def get(self, page):
+        if not self.expired():
+            return self.nonce
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            # Another request may have refreshed it while we waited
+            if self.expired():
+                # Once we have had a nonce, the loaded page only has that one; ask WordPress for a new one
+                self.nonce = await read_nonce_from_page(page, fresh=self.nonce is not None)
+                self.fetched_at = time.monotonic()
+                print(f"    WordPress nonce {'refreshed' if self.nonce else 'not found, falling back to Basic Auth'}")
+            return self.nonce
+
+nonce_cache = NonceCache()
+
+async def read_nonce_from_page(page, fresh=False):
+    # Make sure we're on a page that has the frontend session
+    current_url = page.url
+    if not current_url.startswith(BASE_URL) or "wp-admin" in current_url:
+        await page.goto(BASE_URL, wait_until="networkidle")
+    elif fresh:
+        # WordPress hands out a new REST nonce for the session here, without
+        # navigating away from under requests in flight on this page
         nonce = await page.evaluate("""
-            () => {
-                return window.wpApiSettings?.nonce ||
-                       document.querySelector('meta[name="wp-api-nonce"]')?.content ||
-                       null;
+            async (url) => {
+                try {
+                    const response = await fetch(url, {credentials: 'include'});
+                    const text = (await response.text()).trim();
+                    return response.ok && /^[0-9a-f]+$/i.test(text) && text !== '0' ? text : null;
+                } catch (error) {
+                    return null;
+                }
             }
-        """)
+        """, urljoin(BASE_URL + "/", "wp-admin/admin-ajax.php?action=rest-nonce"))
+        if nonce:
+            return nonce
+        # Older WordPress: the page embeds the nonce it was rendered with
+        await page.goto(BASE_URL, wait_until="networkidle")
 
-        print(f"    Debug: Current page: {page.url}")
-        print(f"    Debug: WordPress nonce found: {nonce is not None}")
+    # Try to get WordPress nonce from the page
+    return await page.evaluate("""
+        () => {
+            return window.wpApiSettings?.nonce ||
+                   document.querySelector('meta[name="wp-api-nonce"]')?.content ||
+                   null;
+        }
+    """)
 
-        js_body = json.dumps(body) if content_type=="application/json" and body else \
-                  ("new URLSearchParams(" + json.dumps(body) + ")" if body else "null")
+# ==== HELPER: FETCH USING BROWSER CONTEXT ====
+async def browser_fetch(page, url, method, body, content_type, auth, nonce):
+    js_body = json.dumps(body) if content_type=="application/json" and body else \
+              ("new URLSearchParams(" + json.dumps(body) + ")" if body else "null")
 
-        headers = {
-            'Content-Type': content_type
-        }
+    headers = {
+        'Content-Type': content_type
+    }
 
-        # Use nonce if available, otherwise fall back to Basic Auth
-        if nonce:
-            headers['X-WP-Nonce'] = nonce
-            print("    Using WordPress nonce for authentication")
-        else:
-            headers['Authorization'] = auth
-            print("    Using Basic Auth (no nonce found)")
-
-        js_code = f"""
-        async () => {{
-            try {{
-                const headers = {json.dumps(headers)};
-                const response = await fetch('{url}', {{
-                    method: '{method}',
-                    headers: headers,
-                    body: {js_body},
-                    credentials: 'include'
-                }});
-                return {{status: response.status, ok: response.ok}};
-            }} catch (error) {{
-                return {{status: 0, ok: false, error: error.message}};
+    # Use nonce if available, otherwise fall back to Basic Auth
+    if nonce:
+        headers['X-WP-Nonce'] = nonce
+    else:
+        headers['Authorization'] = auth
+
+    js_code = f"""
+    async () => {{
+        try {{
+            const headers = {json.dumps(headers)};
+            const started = performance.now();
+            const response = await fetch('{url}', {{
+                method: '{method}',
+                headers: headers,
+                body: {js_body},
+                credentials: 'include'
+            }});
+            // fetch resolves once the headers are in
+            const ttfb = performance.now() - started;
+            const buffer = await response.arrayBuffer();
+            const total = performance.now() - started;
+            let code = null;
+            if (response.status === 401 || response.status === 403) {{
+                try {{
+                    code = JSON.parse(new TextDecoder().decode(buffer)).code;
+                }} catch (error) {{}}
             }}
+            return {{status: response.status, ok: response.ok, code: code,
+                     ttfb_ms: ttfb, total_ms: total, bytes: buffer.byteLength}};
+        }} catch (error) {{
+            return {{status: 0, ok: false, error: error.message}};
         }}
-        """
-        result = await page.evaluate(js_code)
+    }}
+    """
+    result = await page.evaluate(js_code)
+    result["auth"] = "nonce" if nonce else "basic"
+    return result
+
+async def fetch_with_browser_context(page, url, method, body, content_type, auth):
+    try:
+        nonce = await nonce_cache.get(page)
+        result = await browser_fetch(page, url, method, body, content_type, auth, nonce)
+
+        # Only go back to the page for a fresh nonce when WordPress rejects the cached one
+        if result.get("code") == "rest_cookie_invalid_nonce":
+            print("    Cached nonce rejected, refreshing")
+            nonce_cache.invalidate(nonce)
+            fresh_nonce = await nonce_cache.get(page)
+            if fresh_nonce != nonce:
+                result = await browser_fetch(page, url, method, body, content_type, auth, fresh_nonce)
+            else:
+                print("    No new nonce available, not retrying")
+
         return result
     except Exception as e:
         print(f"  Browser fetch error: {e}")
         return {"ok": False, "status": 0}
 
+# ==== DIRECT HTTP REPLAY ENGINE ====
+TEXT_MIME_HINTS = ("json", "text", "xml", "javascript", "x-www-form-urlencoded")
+
+def har_headers(headers):
+    return [{"name": k, "value": v} for k, v in headers.items()]
+
+def har_content(raw, mime_type):
+    """Build a HAR content object, base64-encoding anything that isn't text."""
+    content = {"size": len(raw), "mimeType": mime_type}
+    if any(hint in mime_type for hint in TEXT_MIME_HINTS):
+        content["text"] = raw.decode("utf-8", errors="replace")
+    else:
+        content["text"] = base64.b64encode(raw).decode()
+        content["encoding"] = "base64"
+    return content
+
+def keeps_attachment(mime_type, size):
+    return "json" not in mime_type and size > ATTACH_MIN_BYTES
+
+def attach_content(raw, mime_type, attachments_dir):
+    """HAR content for a body saved as a file in attachments_dir, named like Playwright's attach mode."""
+    extension = mime_type.split(";")[0].split("/")[-1].strip()
+    name = hashlib.sha1(raw).hexdigest() + (f".{extension}" if extension.isalnum() else "")
+    path = os.path.join(attachments_dir, name)
+    if not os.path.exists(path):
+        os.makedirs(attachments_dir, exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(raw)
+    return {"size": len(raw), "mimeType": mime_type, "_file": name}
+
+def settle_attachment(content, shard_dir, attachments_dir):
+    """Inline an attached body (JSON, or small enough), or move it next to the merged HAR."""
+    name = content.get("_file")
+    if not name or os.path.dirname(name) == os.path.basename(attachments_dir):
+        # Nothing attached, or already settled by an earlier merge (a carried-over HAR)
+        return
+    source = os.path.join(shard_dir, name)
+    if not os.path.exists(source):
+        print(f" Missing HAR attachment {source}, dropping it")
+        del content["_file"]
+        return
+
+    mime_type = content.get("mimeType", "")
+    if not keeps_attachment(mime_type, os.path.getsize(source)):
+        with open(source, "rb") as f:
+            raw = f.read()
+        del content["_file"]
+        content.update(har_content(raw, mime_type))
+        return
+
+    # Several entries can share one file (names are content hashes)
+    target = os.path.join(attachments_dir, name)
+    if not os.path.exists(target):
+        os.makedirs(attachments_dir, exist_ok=True)
+        shutil.copyfile(source, target)
+    content["_file"] = os.path.join(os.path.basename(attachments_dir), name)
+
+def har_context_options(scope=HAR_SCOPE, content=HAR_CONTENT):
+    """Playwright HAR recording options: which URLs to record and where bodies go."""
+    options = {"record_har_content": content}
+    if scope == "rest":
+        options["record_har_url_filter"] = REST_URL_PATTERN
+    return options
+
+class HttpReplayEngine:
+    """Replays REST operations over a keep-alive requests pool, writing its own HAR entries.
+
+    Reuses the cookies and nonce harvested by login_to_wordpress so the calls run
+    under the same session as the browser, without a page.evaluate per request.
+    """
+
+    def __init__(self, page, auth, cookies=(), concurrency=CONCURRENCY, attachments_dir=None):
+        self.page = page
+        self.auth = auth
+        self.entries = []
+        # Large non-JSON bodies are written here instead of inline, when set
+        self.attachments_dir = attachments_dir
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, concurrency))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # Mirror the browser contexts' ignore_https_errors
+        self.session.verify = False
+        requests.packages.urllib3.disable_warnings(requests.packages.urllib3.exceptions.InsecureRequestWarning)
+        for cookie in cookies:
+            self.session.cookies.set_cookie(replay_cookie(cookie))
+
+    def send(self, url, method, body, content_type, nonce):
+        headers = {"Content-Type": content_type, "Accept": "application/json"}
+        if nonce:
+            headers["X-WP-Nonce"] = nonce
+        else:
+            headers["Authorization"] = self.auth
+
+        if not body:
+            data = None
+        elif content_type == "application/json":
+            data = json.dumps(body)
+        else:
+            data = urlencode(body)
+
+        started = datetime.now(timezone.utc)
+        start = time.monotonic()
+        response = self.session.request(method, url, headers=headers, data=data, timeout=30)
+        elapsed_ms = (time.monotonic() - start) * 1000
+
+        self.entries.append(self.build_har_entry(started, elapsed_ms, response))
+        return response, elapsed_ms
+
+    def build_har_entry(self, started, elapsed_ms, response):
+        request = response.request
+        req_body = request.body or b""
+        if isinstance(req_body, str):
+            req_body = req_body.encode()
+
+        har_request = {
+            "method": request.method,
+            "url": request.url,
+            "httpVersion": "HTTP/1.1",
+            "cookies": [],
+            "headers": har_headers(request.headers),
+            "queryString": [{"name": k, "value": v} for k, v in parse_qsl(urlparse(request.url).query)],
+            "headersSize": -1,
+            "bodySize": len(req_body),
+        }
+        if req_body:
+            har_request["postData"] = {
+                "mimeType": request.headers.get("Content-Type", ""),
+                "text": req_body.decode("utf-8", errors="replace"),
+            }
+
+        mime_type = response.headers.get("Content-Type", "")
+        if self.attachments_dir and keeps_attachment(mime_type, len(response.content)):
+            content = attach_content(response.content, mime_type, self.attachments_dir)
+        else:
+            content = har_content(response.content, mime_type)
+
+        return {
+            "startedDateTime": started.isoformat().replace("+00:00", "Z"),
+            "time": elapsed_ms,
+            "request": har_request,
+            "response": {
+                "status": response.status_code,
+                "statusText": response.reason or "",
+                "httpVersion": "HTTP/1.1",
+                "cookies": [],
+                "headers": har_headers(response.headers),
+                "content": content,
+                "redirectURL": response.headers.get("Location", ""),
+                "headersSize": -1,
+                "bodySize": len(response.content),
+            },
+            "cache": {},
+            "timings": {"send": 0, "wait": elapsed_ms, "receive": 0},
+        }
+
+    async def fetch(self, url, method, body, content_type):
+        loop = asyncio.get_running_loop()
+        try:
+            nonce = await nonce_cache.get(self.page) if self.page else None
+            response, elapsed_ms = await loop.run_in_executor(None, self.send, url, method, body, content_type, nonce)
+
+            if response.status_code in (401, 403) and error_code(response) == "rest_cookie_invalid_nonce":
+                print("    Cached nonce rejected, refreshing")
+                nonce_cache.invalidate(nonce)
+                fresh_nonce = await nonce_cache.get(self.page)
+                if fresh_nonce != nonce:
+                    nonce = fresh_nonce
+                    response, elapsed_ms = await loop.run_in_executor(None, self.send, url, method, body,
+                                                                      content_type, nonce)
+                else:
+                    print("    No new nonce available, not retrying")
+
+            # requests' elapsed stops when the response headers are parsed
+            return {"ok": response.ok, "status": response.status_code,
+                    "ttfb_ms": response.elapsed.total_seconds() * 1000, "total_ms": elapsed_ms,
+                    "bytes": len(response.content), "auth": "nonce" if nonce else "basic"}
+        except requests.RequestException as e:
+            print(f"  HTTP replay error: {e}")
+            return {"ok": False, "status": 0}
+
+    def write_har(self, har_path):
+        har = {
+            "log": {
+                "version": "1.2",
+                "creator": {"name": "record_wp_har", "version": "1.0"},
+                "pages": [],
+                "entries": self.entries,
+            }
+        }
+        with open(har_path, "w", encoding="utf-8") as f:
+            json.dump(har, f, ensure_ascii=False)
+
+    def close(self):
+        self.session.close()
+
+def replay_cookie(cookie):
+    """A requests cookie for a Playwright one.
+
+    Playwright reports host-only cookies by bare host name, which the stdlib
+    cookie policy never matches for single-label hosts like localhost; the
+    replay session only talks to BASE_URL, so BASE_URL's host-only cookies
+    are stored without a domain instead.
+    """
+    domain = cookie.get("domain", "")
+    if domain == urlparse(BASE_URL).hostname:
+        domain = ""
+    return requests.cookies.create_cookie(cookie["name"], cookie["value"], domain=domain,
+                                          path=cookie.get("path", "/"), secure=cookie.get("secure", False))
+
+def check_replay_engine():
+    """Replay a logged-in request against a local stub WordPress, checking the session cookie arrives."""
+    global BASE_URL
+    seen = []
+
+    class StubWordPress(BaseHTTPRequestHandler):
+        def do_GET(self):
+            seen.append(self.headers.get("Cookie") or "")
+            logged_in = "wordpress_logged_in_stub=admin" in seen[-1]
+            body = json.dumps({"id": 1} if logged_in else {"code": "rest_not_logged_in"}).encode()
+            self.send_response(200 if logged_in else 401)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubWordPress)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = BASE_URL
+    BASE_URL = f"http://localhost:{server.server_address[1]}"
+    try:
+        # Shaped like Playwright's context.cookies() after login_to_wordpress
+        cookie = {"name": "wordpress_logged_in_stub", "value": "admin", "domain": "localhost", "path": "/"}
+        replay = HttpReplayEngine(None, auth_header(BASIC_USER, BASIC_PASS), cookies=[cookie])
+        result = asyncio.run(replay.fetch(f"{BASE_URL}/wp-json/wp/v2/users/me", "GET", None, "application/json"))
+        replay.close()
+    finally:
+        BASE_URL = base_url
+        server.shutdown()
+
+    entry = replay.entries[-1] if replay.entries else {}
+    print(f" Stub server saw Cookie: {seen[-1] if seen else '(no request)'!r}")
+    print(f" Replay result: {result}; HAR entry status {entry.get('response', {}).get('status')}")
+    if result["status"] != 200 or entry.get("response", {}).get("status") != 200:
+        raise SystemExit(" Replay engine check failed: the session cookie did not reach the server")
+    print(" Replay engine check passed")
+
+def error_code(response):
+    try:
+        return response.json().get("code")
+    except (ValueError, AttributeError):
+        return None
+
+# ==== ADAPTIVE RATE LIMITER ====
+class AdaptiveRateLimiter:
+    """Spaces out request dispatches, backing off on 429/503 and latency spikes."""
+
+    def __init__(self, min_delay=0.0, max_delay=MAX_REQUEST_DELAY):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.delay = min_delay
+        self.baseline_latency = None
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        # Holding the lock while sleeping serializes dispatch slots, so the
+        # delay applies between requests no matter how many are in flight
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            if self._next_slot > now:
+                await asyncio.sleep(self._next_slot - now)
+                now = self._next_slot
+            self._next_slot = now + self.delay
+
+    def record(self, status, latency):
+        if status in BACKOFF_STATUSES:
+            self.delay = min(self.max_delay, max(self.delay * 2, 0.5))
+            print(f"    Server pushing back ({status}), delay now {self.delay:.2f}s")
+            return
+
+        if self.baseline_latency is None:
+            self.baseline_latency = latency
+        else:
+            self.baseline_latency = 0.9 * self.baseline_latency + 0.1 * latency
+
+        if latency > 2 * self.baseline_latency:
+            self.delay = min(self.max_delay, self.delay + 0.1)
+        else:
+            self.delay = max(self.min_delay, self.delay * 0.8)
+            if self.delay < 0.01:
+                self.delay = self.min_delay
+
+# ==== REQUEST TELEMETRY ====
+def percentile(ordered, q):
+    """Nearest-rank percentile of an ascending list."""
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+def route_namespace(route):
+    # WordPress namespaces are vendor/version, e.g. wp/v2 or wc/v1
+    return "/".join([segment for segment in route.split("?", 1)[0].split("/") if segment][:2])
+
+class RequestTelemetry:
+    """Appends one JSON line per REST request: route, status, timings, size and auth mode.
+
+    ttfb_ms is null where the transport doesn't expose it (Playwright's
+    APIRequestContext, used when login failed); total_ms then falls back to
+    the time the dispatcher waited for the response.
+    """
+
+    def __init__(self, path, append=False):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.file = open(path, "a" if append else "w", encoding="utf-8")
+
+    def record(self, method, route, path, result, elapsed_ms):
+        ttfb = result.get("ttfb_ms")
+        self.file.write(json.dumps({
+            "time": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+            "method": method,
+            "route": route,
+            "path": path,
+            "status": result["status"],
+            "ttfb_ms": round(ttfb, 1) if ttfb is not None else None,
+            "total_ms": round(result.get("total_ms", elapsed_ms), 1),
+            "bytes": result.get("bytes"),
+            "auth": result.get("auth"),
+        }) + "\n")
+        # One line at a time, so a crashed run keeps what it measured
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+def summarize_telemetry(path):
+    """p50/p95/p99 of total time per route and per namespace, slowest p95 first."""
+    groups = {"route": {}, "namespace": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            for kind, name in (("route", f"{record['method']} {record['route']}"),
+                               ("namespace", route_namespace(record["route"]))):
+                groups[kind].setdefault(name, []).append(record)
+
+    summary = {}
+    for kind, by_name in groups.items():
+        rows = []
+        for name, records in by_name.items():
+            totals = sorted(record["total_ms"] for record in records)
+            ttfbs = sorted(record["ttfb_ms"] for record in records if record["ttfb_ms"] is not None)
+            rows.append({
+                kind: name,
+                "requests": len(records),
+                "errors": sum(1 for record in records if not 200 <= record["status"] < 400),
+                "bytes": sum(record["bytes"] or 0 for record in records),
+                **{f"p{q}_ms": percentile(totals, q) for q in (50, 95, 99)},
+                "ttfb_p95_ms": percentile(ttfbs, 95) if ttfbs else None,
+            })
+        summary[kind] = sorted(rows, key=lambda row: row["p95_ms"], reverse=True)
+    return summary
+
+def print_telemetry_summary(summary, limit=20):
+    for kind, title in (("namespace", "namespace"), ("route", "route")):
+        rows = summary[kind]
+        print(f"\n Latency per {title} (ms, slowest p95 first, {min(limit, len(rows))} of {len(rows)}):")
+        print(f"  {'p50':>8} {'p95':>8} {'p99':>8} {'ttfb p95':>8} {'reqs':>5} {'errs':>5}  {title}")
+        for row in rows[:limit]:
+            ttfb = f"{row['ttfb_p95_ms']:8.1f}" if row["ttfb_p95_ms"] is not None else f"{'-':>8}"
+            print(f"  {row['p50_ms']:8.1f} {row['p95_ms']:8.1f} {row['p99_ms']:8.1f} {ttfb} "
+                  f"{row['requests']:5} {row['errors']:5}  {row[kind]}")
+
 # ==== HIT FETCH ENDPOINTS ====
-async def hit_fetch_endpoints(context, page, auth, endpoints, login_success):
+async def hit_fetch_endpoints(context, page, auth, endpoints, login_success, concurrency=CONCURRENCY, replay=None,
+                              results=None, telemetry=None, limiter=None, semaphore=None):
+    """Send the endpoints, pulled one at a time from any iterable (shareable across concurrent callers).
+
+    (endpoint, result) pairs are appended to `results` as responses come back.
+    """
     successful = 0
-    total = len(endpoints)
+    total = 0
+    endpoints = iter(endpoints)
+    # Pass one semaphore to every call so `concurrency` caps the whole run, not each context
+    semaphore = semaphore or asyncio.Semaphore(max(1, concurrency))
+    # Pass one limiter to every call so backoff outlives a segment and spans contexts
+    limiter = limiter or AdaptiveRateLimiter()
 
     if login_success:
         print(" Using Browser Context + Session for all API requests")
@@ -232,42 +885,65 @@ async def hit_fetch_endpoints(context, page, auth, endpoints, login_success):
     else:
         print(" Using Basic Authentication only (login failed)")
 
-    for i, (method, path, body, content_type, requires_browser_context) in enumerate(endpoints):
+    print(f" Dispatching up to {max(1, concurrency)} request(s) concurrently")
+
+    async def hit(method, path, body, content_type, requires_browser_context, route=None):
+        nonlocal successful
         url = urljoin(BASE_URL, path.lstrip("/"))
-        print(f"→ {method} {url}")
 
-        try:
-            # ALWAYS use browser context for API requests when login was successful
-            if login_success:
-                result = await fetch_with_browser_context(page, url, method, body, content_type, auth)
-            else:
-                # Fallback to direct requests only if login failed
-                request_headers = {
-                    "Authorization": auth,
-                    "Content-Type": content_type,
-                }
+        async with semaphore:
+            await limiter.wait()
+            print(f"→ {method} {url}")
+            started = time.monotonic()
 
-                if body:
-                    if content_type == "application/json":
-                        response = await context.request.fetch(url, method=method, headers=request_headers, data=json.dumps(body))
-                    else:
-                        response = await context.request.fetch(url, method=method, headers=request_headers, form=body)
+            try:
+                if replay:
+                    result = await replay.fetch(url, method, body, content_type)
+                # ALWAYS use browser context for API requests when login was successful
+                elif login_success:
+                    result = await fetch_with_browser_context(page, url, method, body, content_type, auth)
                 else:
-                    response = await context.request.fetch(url, method=method, headers=request_headers)
+                    # Fallback to direct requests only if login failed
+                    request_headers = {
+                        "Authorization": auth,
+                        "Content-Type": content_type,
+                    }
+
+                    if body:
+                        if content_type == "application/json":
+                            response = await context.request.fetch(url, method=method, headers=request_headers, data=json.dumps(body))
+                        else:
+                            response = await context.request.fetch(url, method=method, headers=request_headers, form=body)
+                    else:
+                        response = await context.request.fetch(url, method=method, headers=request_headers)
+
+                    result = {"ok": response.status < 400, "status": response.status,
+                              "bytes": len(await response.body()), "auth": "basic"}
+
+                elapsed = time.monotonic() - started
+                limiter.record(result["status"], elapsed)
+                if telemetry is not None:
+                    telemetry.record(method, route or path, path, result, elapsed * 1000)
 
-                result = {"ok": response.status < 400, "status": response.status}
+                status_emoji = "✅" if result["ok"] else "❌"
+                print(f" {status_emoji} {method} {path} Status: {result['status']}")
+                if result["ok"]:
+                    successful += 1
+                return result
 
-            status_emoji =  if result["ok"] else 
-            print(f" {status_emoji} Status: {result['status']}")
-            if result["ok"]:
-                successful += 1
+            except Exception as e:
+                print(f"  Error: {e}")
 
-            # Small delay between requests to avoid overwhelming the server
-            if i < len(endpoints) - 1:
-                await asyncio.sleep(0.5)
+    async def worker():
+        nonlocal total
+        # Each worker takes the next planned request when its previous one is done
+        for endpoint in endpoints:
+            total += 1
+            result = await hit(*endpoint)
+            if result is not None and results is not None:
+                results.append((endpoint, result))
 
-        except Exception as e:
-            print(f"  Error: {e}")
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
 
     print(f"\n API Summary: {successful}/{total} successful requests")
 
@@ -349,15 +1025,235 @@ async def interact_browser_endpoints(page, context, endpoints):
 
         await page.wait_for_timeout(1500)
 
+# ==== HAR SHARDS ====
+def merge_har_shards(shard_paths, output_path):
+    """Concatenate per-context HAR shards into one HAR, streaming one entry at a time.
+
+    Bodies the shards keep in attached files are inlined, unless they are
+    large and not JSON; those are collected in a directory next to the HAR.
+    """
+    attachments_dir = os.path.splitext(output_path)[0] + ".content"
+    pages = []
+    log_meta = None
+    first = True
+
+    with open(output_path, "w", encoding="utf-8") as out:
+        out.write('{"log": {"entries": [')
+        for shard_path in shard_paths:
+            if not os.path.exists(shard_path):
+                print(f" Missing HAR shard {shard_path}, skipping")
+                continue
+
+            # A carried-over capture can be several GB; never load a shard whole
+            log = {}
+            for entry in iter_har_entries_streaming(shard_path, log_fields=log):
+                post_data = entry.get("request", {}).get("postData")
+                if post_data and "_file" in post_data:
+                    with open(os.path.join(os.path.dirname(shard_path), post_data.pop("_file")), "rb") as f:
+                        post_data["text"] = f.read().decode("utf-8", errors="replace")
+                settle_attachment(entry.get("response", {}).get("content", {}),
+                                  os.path.dirname(shard_path), attachments_dir)
+                if not first:
+                    out.write(",")
+                json.dump(entry, out, ensure_ascii=False)
+                first = False
+
+            if log_meta is None:
+                log_meta = {k: log[k] for k in ("version", "creator", "browser") if k in log}
+            pages.extend(log.get("pages", []))
+
+        out.write('], "pages": ')
+        json.dump(pages, out, ensure_ascii=False)
+        for key, value in (log_meta or {}).items():
+            out.write(f", {json.dumps(key)}: ")
+            json.dump(value, out, ensure_ascii=False)
+        out.write("}}")
+
+    for shard_path in shard_paths:
+        if os.path.exists(shard_path):
+            os.remove(shard_path)
+
+# ==== RECORDING CHECKPOINTS ====
+# The HAR being re-recorded, when coverage-guided runs carry its samples over
+PREVIOUS_HAR = "previous.har"
+
+def endpoint_key(endpoint):
+    method, path = endpoint[:2]
+    return f"{method} {path}"
+
+class RecordingSession:
+    """Checkpoints a recording run so a crashed run resumes instead of starting over.
+
+    Playwright only writes a context's HAR when the context closes, so REST
+    requests are recorded in segments of a fixed number of requests, each on
+    fresh contexts (cloned from the logged-in one) that are closed, and their
+    HAR flushed, when the segment ends. The checkpoint lists the flushed
+    segment files and the requests that got a response in them; a rerun skips
+    those requests, and the final HAR is merged from the segments of all runs.
+    """
+
+    def __init__(self, har_path=HAR_PATH):
+        self.har_path = har_path
+        self.directory = os.path.splitext(har_path)[0] + ".session"
+        self.checkpoint_file = os.path.join(self.directory, "checkpoint.json")
+        self.completed = set()
+        self.segments = []
+        self.next_segment = 0
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def load(self):
+        """Pick up an interrupted run's checkpoint; returns whether there was one."""
+        try:
+            with open(self.checkpoint_file, "r", encoding="utf-8") as f:
+                checkpoint = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+        self.completed = set(checkpoint.get("completed", []))
+        self.segments = [name for name in checkpoint.get("segments", []) if os.path.exists(self.path(name))]
+        self.next_segment = checkpoint.get("next_segment", len(self.segments))
+        return True
+
+    def discard(self):
+        # Don't lose a carried-over capture along with the session
+        if os.path.exists(self.path(PREVIOUS_HAR)) and not os.path.exists(self.har_path):
+            os.replace(self.path(PREVIOUS_HAR), self.har_path)
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.completed = set()
+        self.segments = []
+        self.next_segment = 0
+
+    def carry_over(self):
+        """Move the last run's HAR into the session, so its entries are merged into the new one."""
+        if PREVIOUS_HAR not in self.segments and os.path.exists(self.har_path):
+            os.makedirs(self.directory, exist_ok=True)
+            os.replace(self.har_path, self.path(PREVIOUS_HAR))
+            self.segments.insert(0, PREVIOUS_HAR)
+            self.save()
+        return self.path(PREVIOUS_HAR) if PREVIOUS_HAR in self.segments else None
+
+    def pending(self, endpoints):
+        for endpoint in endpoints:
+            if endpoint_key(endpoint) not in self.completed:
+                yield endpoint
+
+    def segment_paths(self, count):
+        return [self.path(f"segment{self.next_segment:05d}.{i}.har") for i in range(count)]
+
+    def commit(self, har_paths, results):
+        """Record a flushed segment and the requests answered in it."""
+        self.segments.extend(os.path.basename(path) for path in har_paths if os.path.exists(path))
+        # Requests that never got a response (status 0) are retried on resume
+        self.completed.update(endpoint_key(endpoint) for endpoint, result in results if result["status"])
+        self.next_segment += 1
+        self.save()
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self.checkpoint_file + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "completed": sorted(self.completed),
+                "segments": self.segments,
+                "next_segment": self.next_segment,
+            }, f)
+        os.replace(tmp, self.checkpoint_file)
+
+    def finish(self, output_path, har_paths=()):
+        """Merge the given HARs and every segment into output_path and drop the session."""
+        merge_har_shards(list(har_paths) + [self.path(name) for name in self.segments], output_path)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+async def record_segment(browser, session, batch, auth, login_success, storage_state, context_options,
+                         concurrency=CONCURRENCY, contexts=CONTEXTS, replay=None, context=None, page=None,
+                         telemetry=None, limiter=None, semaphore=None):
+    """Send one batch of requests into its own HAR segment and checkpoint it."""
+    results = []
+    if replay:
+        har_paths = session.segment_paths(1)
+        try:
+            await hit_fetch_endpoints(context, page, auth, batch, login_success,
+                                      concurrency=concurrency, replay=replay, results=results, telemetry=telemetry,
+                                      limiter=limiter, semaphore=semaphore)
+        finally:
+            replay.write_har(har_paths[0])
+            replay.entries.clear()
+            session.commit(har_paths, results)
+        return results
+
+    har_paths = session.segment_paths(contexts)
+    pool = []
+    try:
+        for har_path in har_paths:
+            pool_context = await browser.new_context(record_har_path=har_path, storage_state=storage_state,
+                                                     **context_options)
+            pool.append((pool_context, await pool_context.new_page()))
+        # Pass login_success to hit_fetch_endpoints; the contexts pull from one shared batch
+        shared = iter(batch)
+        await asyncio.gather(*(
+            hit_fetch_endpoints(pool_context, pool_page, auth, shared, login_success,
+                                concurrency=concurrency, results=results, telemetry=telemetry, limiter=limiter,
+                                semaphore=semaphore)
+            for pool_context, pool_page in pool
+        ))
+    finally:
+        # Closing the contexts is what writes their HAR; if the browser is gone
+        # this raises and the segment is redone on resume
+        for pool_context, _ in pool:
+            await pool_context.close()
+        session.commit(har_paths, results)
+    return results
+
 # ==== MAIN FUNCTION ====
-async def main():
+async def main(concurrency=CONCURRENCY, contexts=CONTEXTS, engine=ENGINE, openapi_path=OPENAPI_PATH,
+               namespaces=None, methods=None, segment_size=SEGMENT_SIZE, fresh=False, har_scope=HAR_SCOPE,
+               har_content_mode=HAR_CONTENT, coverage_from=None, coverage_target=1.0, telemetry_path=None):
+    if not os.path.exists(openapi_path):
+        raise SystemExit(f" OpenAPI spec not found: {openapi_path} (set WP_OPENAPI_PATH or --openapi)")
+
+    session = RecordingSession(HAR_PATH)
+    resumed = False
+    if fresh:
+        session.discard()
+    elif session.load():
+        resumed = True
+        print(f" Resuming recording: {len(session.completed)} request(s) already captured "
+              f"in {len(session.segments)} segment(s) under {session.directory}")
+    os.makedirs(session.directory, exist_ok=True)
+
+    # A resumed run adds to the interrupted run's measurements
+    telemetry_path = telemetry_path or os.path.splitext(HAR_PATH)[0] + ".telemetry.jsonl"
+    telemetry = RequestTelemetry(telemetry_path, append=resumed)
+
+    if coverage_from and os.path.abspath(coverage_from) == os.path.abspath(HAR_PATH):
+        # Re-recording the same HAR: keep what it already has, and only add the gaps
+        coverage_from = session.carry_over()
+        if coverage_from:
+            print(f" Keeping the samples in {HAR_PATH}; recording only what it lacks")
+    elif coverage_from and not os.path.exists(coverage_from):
+        raise SystemExit(f" Coverage source not found: {coverage_from}")
+
+    # Parse the spec (and the coverage source) while the browser launches and logs in
+    plan_loading = asyncio.get_running_loop().run_in_executor(None, load_plan_inputs, openapi_path,
+                                                              coverage_from, coverage_target)
+
     auth = auth_header(BASIC_USER, BASIC_PASS)
     print(f" Authentication: Using Basic Auth with user '{BASIC_USER}'")
 
+    contexts = max(1, contexts)
+    segment_size = max(1, segment_size)
+    # Login, session setup and browser interactions; REST requests go into the segments
+    main_har = session.path("main.har")
+    context_options = {
+        **har_context_options(har_scope, har_content_mode),
+        "ignore_https_errors": True,
+        "viewport": {"width": 1280, "height": 720},
+    }
+
     async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=False)
-        context = await browser.new_context(record_har_path=HAR_PATH, record_har_content="embed",
-                                            ignore_https_errors=True, viewport={"width": 1280, "height": 720})
+        browser = await p.chromium.launch(headless=contexts > 1)
+        context = await browser.new_context(record_har_path=main_har, **context_options)
         page = await context.new_page()
 
         # Login first to get session cookies
@@ -369,16 +1265,104 @@ async def main():
             await page.goto(f"{BASE_URL}/wp-json/", wait_until="networkidle")
             await asyncio.sleep(1)
 
+        # Each segment clones the logged-in session into fresh contexts, each
+        # recording its own HAR shard
+        storage_state = await context.storage_state()
+        if contexts > 1 and engine != "http":
+            print(f" Recording across {contexts} browser contexts")
+
+        spec, coverage = await plan_loading
+        endpoints = session.pending(plan_fetch_endpoints(spec, namespaces, methods, coverage))
+        if namespaces or methods:
+            print(f" Limiting requests to namespaces: {', '.join(namespaces) if namespaces else 'all'}; "
+                  f"methods: {', '.join(methods).upper() if methods else 'all'}")
+
         print("\n Starting API requests...\n")
-        # Pass login_success to hit_fetch_endpoints
-        await hit_fetch_endpoints(context, page, auth, fetch_endpoints, login_success)
+        replay = None
+        if engine == "http":
+            # REST calls bypass the browser; Playwright is only used for the
+            # browser_endpoints interactions below
+            print(" Replaying REST requests over direct HTTP")
+            replay = HttpReplayEngine(page if login_success else None, auth,
+                                      cookies=await context.cookies() if login_success else (),
+                                      concurrency=concurrency,
+                                      attachments_dir=session.directory if har_content_mode == "attach" else None)
+
+        # One rate limiter for the whole run: pushback seen in one segment or context slows them all
+        limiter = AdaptiveRateLimiter()
+        # ...and one cap on in-flight requests, however many contexts share it
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        while True:
+            batch = list(islice(endpoints, segment_size))
+            if not batch:
+                break
+            results = await record_segment(browser, session, batch, auth, login_success, storage_state,
+                                           context_options, concurrency=concurrency, contexts=contexts,
+                                           replay=replay, context=context, page=page, telemetry=telemetry,
+                                           limiter=limiter, semaphore=semaphore)
+            if coverage is not None:
+                coverage.record(results)
+            print(f" Checkpoint: {len(session.completed)} request(s) captured in {len(session.segments)} segment(s)")
+
+        if replay:
+            replay.close()
+        if coverage is not None:
+            print(f" Coverage: {coverage.summary()}")
+        telemetry.close()
 
         print("\n Starting browser interactions...\n")
         await interact_browser_endpoints(page, context, browser_endpoints)
 
         await context.close()
         await browser.close()
-        print(f"\n HAR saved to {HAR_PATH}")
+
+    print(f" Merging {len(session.segments) + 1} HAR shards...")
+    session.finish(HAR_PATH, [main_har])
+    print(f"\n HAR saved to {HAR_PATH}")
+
+    summary = summarize_telemetry(telemetry_path)
+    print_telemetry_summary(summary)
+    summary_path = os.path.splitext(telemetry_path)[0] + ".summary.json"
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    print(f"\n Request telemetry saved to {telemetry_path} (summary: {summary_path})")
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Record WordPress REST and browser traffic into a HAR file")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY,
+                        help="maximum number of API requests in flight at once")
+    parser.add_argument("--contexts", type=int, default=CONTEXTS,
+                        help="number of headless browser contexts to record with")
+    parser.add_argument("--engine", choices=["browser", "http"], default=ENGINE,
+                        help="send REST calls through the browser page or directly over HTTP")
+    parser.add_argument("--openapi", default=OPENAPI_PATH, help="OpenAPI spec to plan REST requests from")
+    parser.add_argument("--namespace", action="append", dest="namespaces", metavar="NAMESPACE",
+                        help="only request routes in this namespace, e.g. wp/v2 (repeatable)")
+    parser.add_argument("--method", action="append", dest="methods", metavar="METHOD",
+                        help="only send requests with this HTTP method (repeatable)")
+    parser.add_argument("--segment-size", type=int, default=SEGMENT_SIZE,
+                        help="requests per checkpointed HAR segment")
+    parser.add_argument("--fresh", action="store_true",
+                        help="discard an interrupted run's checkpoint instead of resuming it")
+    parser.add_argument("--har-scope", choices=["rest", "all"], default=HAR_SCOPE,
+                        help="record only REST API traffic (/wp-json/), or every request incl. pages and assets")
+    parser.add_argument("--har-content", choices=["embed", "attach"], default=HAR_CONTENT,
+                        help="inline every body, or keep large non-JSON bodies in files next to the HAR")
+    parser.add_argument("--coverage-from", metavar="HAR_OR_SPEC",
+                        help="earlier capture (HAR, or spec extracted from one) to record only the gaps of; "
+                             "passing HAR_PATH itself keeps its samples in the new HAR")
+    parser.add_argument("--coverage-target", type=float, default=1.0,
+                        help="stop once this share of operations has a 2xx sample (with --coverage-from)")
+    parser.add_argument("--telemetry", metavar="JSONL_FILE",
+                        help="where to write per-request timings (default: next to HAR_PATH)")
+    parser.add_argument("--check-replay", action="store_true",
+                        help="check the HTTP replay engine against a local stub server and exit")
+    args = parser.parse_args()
+    if args.check_replay:
+        check_replay_engine()
+        raise SystemExit(0)
+    asyncio.run(main(concurrency=args.concurrency, contexts=args.contexts, engine=args.engine,
+                     openapi_path=args.openapi, namespaces=args.namespaces, methods=args.methods,
+                     segment_size=args.segment_size, fresh=args.fresh, har_scope=args.har_scope,
+                     har_content_mode=args.har_content, coverage_from=args.coverage_from,
+                     coverage_target=args.coverage_target, telemetry_path=args.telemetry))
@@ -0,0 +1,183 @@
+# Incremental JSON schema inference: infer_schema() per sample, merge_schemas()
+# across samples, finalize_schema() to render OpenAPI. Nodes are plain,
+# size-capped dicts so they can be cached and sent between processes.
+
+# Distinct string values kept per field for enum detection
+MAX_ENUM_VALUES = 10
+
+# Strings longer than this are never treated as enum candidates
+MAX_ENUM_LENGTH = 64
+
+# Samples a string field needs before it can become an enum
+ENUM_MIN_SAMPLES = 3
+
+# Objects with more keys than this are treated as maps (additionalProperties)
+MAX_PROPERTIES = 200
+
+# Array elements inspected per sample
+MAX_ARRAY_ITEMS = 100
+
+# Nesting below this depth is recorded as an opaque object/array
+MAX_DEPTH = 16
+
+SCALAR_TYPES = ("null", "boolean", "integer", "number")
+
+
+def infer_schema(value, depth=0):
+    """Build a schema node describing a single JSON value."""
+    node = {"samples": 1}
+
+    if value is None:
+        node["null"] = 1
+    elif isinstance(value, bool):
+        node["boolean"] = 1
+    elif isinstance(value, int):
+        node["integer"] = 1
+    elif isinstance(value, float):
+        node["number"] = 1
+    elif isinstance(value, str):
+        node["string"] = {"samples": 1, "values": [value] if len(value) <= MAX_ENUM_LENGTH else None}
+    elif isinstance(value, dict):
+        obj = {"samples": 1, "properties": {}, "additional": None}
+        if depth < MAX_DEPTH:
+            if len(value) > MAX_PROPERTIES:
+                for item in value.values():
+                    obj["additional"] = merge_schemas(obj["additional"], infer_schema(item, depth + 1))
+            else:
+                obj["properties"] = {key: infer_schema(item, depth + 1) for key, item in value.items()}
+        node["object"] = obj
+    elif isinstance(value, list):
+        items = None
+        if depth < MAX_DEPTH:
+            for item in value[:MAX_ARRAY_ITEMS]:
+                items = merge_schemas(items, infer_schema(item, depth + 1))
+        node["array"] = {"samples": 1, "items": items}
+
+    return node
+
+
+def merge_schemas(a, b):
+    """Merge two schema nodes into a new one; either may be None."""
+    if a is None:
+        return b
+    if b is None:
+        return a
+
+    merged = {"samples": a["samples"] + b["samples"]}
+
+    for type_name in SCALAR_TYPES:
+        if type_name in a or type_name in b:
+            merged[type_name] = a.get(type_name, 0) + b.get(type_name, 0)
+
+    if "string" in a or "string" in b:
+        merged["string"] = _merge_strings(a.get("string"), b.get("string"))
+
+    if "object" in a or "object" in b:
+        merged["object"] = _merge_objects(a.get("object"), b.get("object"))
+
+    if "array" in a or "array" in b:
+        merged["array"] = _merge_arrays(a.get("array"), b.get("array"))
+
+    return merged
+
+
+def _merge_strings(a, b):
+    if a is None or b is None:
+        return a or b
+
+    values = None
+    if a["values"] is not None and b["values"] is not None:
+        values = a["values"] + [value for value in b["values"] if value not in a["values"]]
+        if len(values) > MAX_ENUM_VALUES:
+            values = None
+
+    return {"samples": a["samples"] + b["samples"], "values": values}
+
+
+def _merge_objects(a, b):
+    if a is None or b is None:
+        return a or b
+
+    properties = dict(a["properties"])
+    for key, node in b["properties"].items():
+        properties[key] = merge_schemas(properties.get(key), node)
+
+    additional = merge_schemas(a["additional"], b["additional"])
+
+    # Too many distinct keys across samples: it's a map keyed by data, not a record
+    if len(properties) > MAX_PROPERTIES or (additional is not None and properties):
+        for node in properties.values():
+            additional = merge_schemas(additional, node)
+        properties = {}
+
+    return {"samples": a["samples"] + b["samples"], "properties": properties, "additional": additional}
+
+
+def _merge_arrays(a, b):
+    if a is None or b is None:
+        return a or b
+    return {"samples": a["samples"] + b["samples"], "items": merge_schemas(a["items"], b["items"])}
+
+
+def finalize_schema(node):
+    """Render a schema node as an OpenAPI 3.0 schema."""
+    if node is None:
+        return {}
+
+    schemas = []
+    if "boolean" in node:
+        schemas.append({"type": "boolean"})
+    if "number" in node:
+        schemas.append({"type": "number"})
+    elif "integer" in node:
+        schemas.append({"type": "integer"})
+    if "string" in node:
+        schemas.append(_finalize_string(node["string"]))
+    if "object" in node:
+        schemas.append(_finalize_object(node["object"]))
+    if "array" in node:
+        array = node["array"]
+        schemas.append({"type": "array", "items": finalize_schema(array["items"])})
+
+    if "null" in node:
+        # OAS 3.0 ignores nullable without a type in the same schema, so an
+        # all-null field falls back to a string and every oneOf branch is flagged
+        if not schemas:
+            schemas.append({"type": "string"})
+        for schema in schemas:
+            schema["nullable"] = True
+
+    if not schemas:
+        return {}
+    if len(schemas) == 1:
+        return schemas[0]
+    return {"oneOf": schemas}
+
+
+def _finalize_string(string):
+    schema = {"type": "string"}
+    values = string["values"]
+
+    # Only call it an enum once several distinct values have each repeated
+    if values and string["samples"] >= ENUM_MIN_SAMPLES and 1 < len(values) < string["samples"]:
+        schema["enum"] = sorted(values)
+
+    return schema
+
+
+def _finalize_object(obj):
+    schema = {"type": "object"}
+
+    if obj["properties"]:
+        schema["properties"] = {key: finalize_schema(node) for key, node in obj["properties"].items()}
+
+        # A single sample can't tell required fields from optional ones
+        if obj["samples"] > 1:
+            required = [key for key, node in obj["properties"].items() if node["samples"] == obj["samples"]]
+            if required:
+                schema["required"] = required
+
+    if obj["additional"] is not None:
+        schema["additionalProperties"] = finalize_schema(obj["additional"])
+
+    return schema
@@ -0,0 +1,105 @@
+import argparse
+import json
+import os
+import time
+
+import yaml
+
+# libyaml bindings are several times faster; PyYAML without them falls back to pure Python
+try:
+    from yaml import CSafeDumper as SafeDumper, CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeDumper, SafeLoader
+
+DEFAULT_BENCHMARK_FILE = "output/drupal_jsonapi_openapi.json"
+
+
+class SpecDumper(SafeDumper):
+    # Merged specs share subtrees (see openapi_merge); write them out in full, not as &id001 anchors
+    def ignore_aliases(self, data):
+        return True
+
+
+def json_sibling(path):
+    return os.path.splitext(path)[0] + ".json"
+
+
+def load_spec(path, prefer_json=True):
+    """Load a JSON or YAML spec.
+
+    Stages write JSON next to every YAML they render, so for a .yaml path an
+    up-to-date .json sibling is read instead (or the only one, when the YAML
+    copy was skipped).
+    """
+    if path.endswith((".yaml", ".yml")) and prefer_json:
+        sibling = json_sibling(path)
+        if os.path.exists(sibling) and (not os.path.exists(path)
+                                        or os.path.getmtime(sibling) >= os.path.getmtime(path)):
+            path = sibling
+
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    if path.endswith((".yaml", ".yml")):
+        with open(path, "r", encoding="utf-8") as f:
+            return yaml.load(f, Loader=SafeLoader)
+    raise ValueError(f"Unsupported file type: {path}")
+
+
+def dump_yaml(spec, f, **options):
+    options = {"sort_keys": False, "allow_unicode": True, "default_flow_style": False, **options}
+    yaml.dump(spec, f, Dumper=SpecDumper, **options)
+
+
+def save_spec(spec, path, yaml_copy=True):
+    """Write a spec as JSON (the format stages read), plus a YAML rendering for .yaml paths.
+
+    With yaml_copy=False only the JSON sibling is written, for intermediates
+    nobody reads by hand.
+    """
+    json_path = json_sibling(path) if path.endswith((".yaml", ".yml")) else path
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(spec, f, indent=2, ensure_ascii=False)
+
+    if path.endswith((".yaml", ".yml")) and yaml_copy:
+        with open(path, "w", encoding="utf-8") as f:
+            dump_yaml(spec, f)
+    return json_path
+
+
+def benchmark(path=DEFAULT_BENCHMARK_FILE, rounds=3):
+    with open(path, "r", encoding="utf-8") as f:
+        spec = json.load(f)
+    json_text = json.dumps(spec, indent=2, ensure_ascii=False)
+    yaml_text = yaml.dump(spec, Dumper=SpecDumper, sort_keys=False, allow_unicode=True)
+
+    def best(fn):
+        times = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    cases = [
+        ("json", lambda: json.loads(json_text), lambda: json.dumps(spec, indent=2, ensure_ascii=False)),
+        ("yaml (pure Python)", lambda: yaml.load(yaml_text, Loader=yaml.SafeLoader),
+         lambda: yaml.dump(spec, Dumper=yaml.SafeDumper, sort_keys=False, allow_unicode=True)),
+    ]
+    if SafeLoader is not yaml.SafeLoader:
+        cases.append(("yaml (libyaml)", lambda: yaml.load(yaml_text, Loader=SafeLoader),
+                      lambda: yaml.dump(spec, Dumper=SpecDumper, sort_keys=False, allow_unicode=True)))
+    else:
+        print(" PyYAML has no libyaml bindings here; only the pure-Python YAML path is measured")
+
+    print(f" {path}: {len(json_text) / 1024:.0f} KiB as JSON, {len(yaml_text) / 1024:.0f} KiB as YAML")
+    for label, load, dump in cases:
+        print(f"  {label:20} load {best(load) * 1000:9.1f} ms   dump {best(dump) * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark spec load/dump times per format")
+    parser.add_argument("file", nargs="?", default=DEFAULT_BENCHMARK_FILE, help="JSON spec to benchmark with")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    benchmark(args.file, args.rounds)
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+
+# Per-step manifests of input digests and parameters, relative to the project root
+DEFAULT_MANIFEST_FILE = "output/pipeline_manifest.json"
+
+HASH_CHUNK_SIZE = 1 << 20
+
+
+class StepCache:
+    """Make-like step skipping keyed on content hashes.
+
+    A step is fresh when its input digests and parameters match what was
+    recorded the last time it succeeded, and its outputs are still the files it
+    wrote then. Inputs are files or (directory, suffixes) trees. File digests
+    are reused while a file's size and mtime are unchanged, so multi-GB HARs
+    and plugin trees are only re-read after they change.
+    """
+
+    def __init__(self, root=".", manifest_file=DEFAULT_MANIFEST_FILE):
+        self.root = root
+        self.manifest_file = os.path.join(root, manifest_file)
+        try:
+            with open(self.manifest_file, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.manifest = {}
+        self.manifest.setdefault("steps", {})
+        self.manifest.setdefault("stats", {})
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def file_digest(self, name):
+        path = self.path(name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        signature = [stat.st_size, stat.st_mtime_ns]
+        cached = self.manifest["stats"].get(name)
+        if cached and cached[:2] == signature:
+            return cached[2]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        self.manifest["stats"][name] = signature + [digest.hexdigest()]
+        return digest.hexdigest()
+
+    def tree_digest(self, directory, suffixes):
+        if not os.path.isdir(self.path(directory)):
+            return None
+        digest = hashlib.sha256()
+        for base, dirs, files in os.walk(self.path(directory)):
+            dirs.sort()
+            for filename in sorted(files):
+                if suffixes and not filename.endswith(tuple(suffixes)):
+                    continue
+                name = os.path.relpath(os.path.join(base, filename), self.root)
+                digest.update(f"{name}\0{self.file_digest(name)}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+    def digest(self, source):
+        if isinstance(source, (tuple, list)):
+            return self.tree_digest(*source)
+        return self.file_digest(source)
+
+    def fingerprint(self, inputs, params=None):
+        return {
+            "inputs": {str(source if isinstance(source, str) else list(source)): self.digest(source)
+                       for source in inputs},
+            "params": params or {},
+        }
+
+    def is_fresh(self, step, inputs, outputs, params=None):
+        recorded = self.manifest["steps"].get(step)
+        if recorded is None or set(recorded["outputs"]) != set(outputs):
+            return False
+
+        fingerprint = self.fingerprint(inputs, params)
+        if None in fingerprint["inputs"].values() or recorded["fingerprint"] != fingerprint:
+            return False
+
+        # Outputs edited or deleted since are rebuilt too
+        return all(digest is not None and self.file_digest(name) == digest
+                   for name, digest in recorded["outputs"].items())
+
+    def record(self, step, inputs, outputs, params=None):
+        self.manifest["steps"][step] = {
+            "fingerprint": self.fingerprint(inputs, params),
+            "outputs": {name: self.file_digest(name) for name in outputs},
+        }
+        self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.manifest_file) or ".", exist_ok=True)
+        tmp = self.manifest_file + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp, self.manifest_file)
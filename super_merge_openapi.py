@@ -1,6 +1,5 @@
-import yaml
-import json
-from copy import deepcopy
+from openapi_merge import merge_specs
+from spec_io import load_spec, save_spec
 
 def resolve_references(spec):
     """Basic reference resolver - removes broken $ref"""
@@ -38,12 +37,10 @@ def resolve_references(spec):
     return clean_refs(spec)
 
 def add_basic_schemas(spec):
-    """Add basic schema definitions to components"""
-    if 'components' not in spec:
-        spec['components'] = {}
-    
-    if 'schemas' not in spec['components']:
-        spec['components']['schemas'] = {}
+    """Add basic schema definitions to components (on a copy; the input spec is left as is)"""
+    spec = dict(spec)
+    spec['components'] = dict(spec.get('components') or {})
+    spec['components']['schemas'] = dict(spec['components'].get('schemas') or {})
     
     # Add basic product schema if missing
     if 'product' not in spec['components']['schemas']:
@@ -69,77 +66,29 @@ def add_basic_schemas(spec):
     
     return spec
 
-# Load the two specs with absolute paths
-with open("/home/user/api-spec-generator/output/merged_openapi.yaml") as f:
-    wp_spec = yaml.safe_load(f)
-
-with open("/home/user/api-spec-generator/captures/wp_rest_openapi.yaml") as f:
-    har_spec = yaml.safe_load(f)
-
-# Clean broken references from wp_spec before merging
-wp_spec_clean = resolve_references(wp_spec)
-
-# Add basic schemas to HAR spec (which will be our base)
-har_spec_with_schemas = add_basic_schemas(deepcopy(har_spec))
-
-merged_spec = deepcopy(har_spec_with_schemas)  # Use HAR spec as base
-
-# Merge paths
-for path, wp_methods in wp_spec_clean.get("paths", {}).items():
-    if path not in merged_spec["paths"]:
-        merged_spec["paths"][path] = deepcopy(wp_methods)
-    else:
-        for method, wp_details in wp_methods.items():
-            if method not in merged_spec["paths"][path]:
-                merged_spec["paths"][path][method] = deepcopy(wp_details)
-            else:
-                har_details = merged_spec["paths"][path][method]
-
-                # Merge parameters intelligently
-                har_params = har_details.get("parameters", [])
-                wp_params = wp_details.get("parameters", [])
-                existing_keys = {(p["name"], p["in"]) for p in har_params}
-
-                for p in wp_params:
-                    key = (p["name"], p["in"])
-                    if key not in existing_keys:
-                        # If HAR is missing, use WPOpenAPI default
-                        if "example" not in p and "default" in p.get("schema", {}):
-                            p["example"] = p["schema"]["default"]
-                        har_params.append(deepcopy(p))
-                har_details["parameters"] = har_params
-
-                # Merge requestBody
-                if "requestBody" not in har_details and "requestBody" in wp_details:
-                    merged_spec["paths"][path][method]["requestBody"] = deepcopy(wp_details["requestBody"])
-                elif "requestBody" in wp_details and "requestBody" in har_details:
-                    # Merge content types
-                    har_content = har_details["requestBody"].get("content", {})
-                    wp_content = wp_details["requestBody"].get("content", {})
-                    for ctype, schema in wp_content.items():
-                        if ctype not in har_content:
-                            har_content[ctype] = deepcopy(schema)
-                    har_details["requestBody"]["content"] = har_content
-
-                # Merge responses
-                har_responses = har_details.get("responses", {})
-                for code, resp in wp_details.get("responses", {}).items():
-                    if code not in har_responses:
-                        har_responses[code] = deepcopy(resp)
-                har_details["responses"] = har_responses
-
-# Merge components from cleaned spec
-for comp_type, comp_dict in wp_spec_clean.get("components", {}).items():
-    merged_spec.setdefault("components", {}).setdefault(comp_type, {})
-    for name, value in comp_dict.items():
-        if name not in merged_spec["components"][comp_type]:
-            merged_spec["components"][comp_type][name] = deepcopy(value)
-
-# Ensure we have basic schemas
-merged_spec = add_basic_schemas(merged_spec)
-
-# Save merged spec to the specified output path
-with open("/home/user/api-spec-generator/captures/merged_spec_smart.yaml", "w") as f:
-    yaml.dump(merged_spec, f, sort_keys=False)
+def super_merge(wp_spec, har_spec):
+    """Smart-merge the static+WP spec into the HAR spec (which wins on conflicts)"""
+    # Clean broken references from wp_spec before merging
+    wp_spec_clean = resolve_references(wp_spec)
+    
+    # HAR spec (with basic schemas) is the base; the WP spec fills in missing
+    # operations, parameters, request body types, responses and components.
+    # Paths match by template, so /posts/{id} meets /posts/(?P<id>[\d]+)
+    merged_spec = merge_specs([add_basic_schemas(har_spec), wp_spec_clean], match_templates=True)
+    
+    # Ensure we have basic schemas
+    return add_basic_schemas(merged_spec)
 
-print("Smart merged spec saved to /home/user/api-spec-generator/captures/merged_spec_smart.yaml")
+if __name__ == "__main__":
+    # Load the two specs with absolute paths
+    # (load_spec reads the JSON the earlier stages write next to these)
+    wp_spec = load_spec("/home/user/api-spec-generator/output/merged_openapi.yaml")
+    
+    har_spec = load_spec("/home/user/api-spec-generator/captures/wp_rest_openapi.yaml")
+    
+    merged_spec = super_merge(wp_spec, har_spec)
+    
+    # Save merged spec to the specified output path
+    save_spec(merged_spec, "/home/user/api-spec-generator/captures/merged_spec_smart.yaml")
+    
+    print("Smart merged spec saved to /home/user/api-spec-generator/captures/merged_spec_smart.yaml")